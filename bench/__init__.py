@@ -0,0 +1,47 @@
+"""
+Benchmarks for the PicoBot, run from the repository root, e.g.
+
+    python -m bench.latency
+
+Results are appended to bench/results/<name>.jsonl so runs can be
+compared over time.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentile(values, pct):
+    """Nearest rank percentile of a list of numbers"""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_result(name, result):
+    """Append one run to bench/results/<name>.jsonl and return the path"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    record = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'revision': git_revision(),
+              'host': platform.node()}
+    record.update(result)
+    path = os.path.join(RESULTS_DIR, name + '.jsonl')
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    return path
@@ -0,0 +1,88 @@
+"""
+Gamepad event decoding throughput: per-event updateState() versus
+updateStateBulk(), which reads everything queued in one call.
+
+A recording of synthetic joystick events (initial state followed by
+fast stick motion on two axes) is written to a file and replayed
+through a Gamepad opened on that file instead of /dev/input/js0.
+
+    python -m bench.gamepad_events [--events N] [--repeat R]
+"""
+
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import time
+
+from . import save_result
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'joystick_ctrl', 'ps3_joystk'))
+import Gamepad  # noqa: E402
+
+
+def write_recording(path, count):
+    """Write the init events of a PS3 pad then count axis events"""
+    with open(path, 'wb') as f:
+        for index in range(17):
+            f.write(struct.pack('IhBB', 0, 0, Gamepad.Gamepad.EVENT_CODE_INIT_BUTTON, index))
+        for index in range(6):
+            f.write(struct.pack('IhBB', 0, 0, Gamepad.Gamepad.EVENT_CODE_INIT_AXIS, index))
+        for i in range(count):
+            value = (i * 97) % 65535 - 32767
+            f.write(struct.pack('IhBB', i, value, Gamepad.Gamepad.EVENT_CODE_AXIS, 1 + 2 * (i & 1)))
+    return 23 + count
+
+
+def open_recording(path, gamepadType=Gamepad.PS3):
+    """Construct a gamepad reading from a recording file"""
+    Gamepad.open = lambda name, mode: open(path, mode)
+    try:
+        return gamepadType()
+    finally:
+        del Gamepad.open
+
+
+def per_event(path, total):
+    gamepad = open_recording(path)
+    t0 = time.perf_counter()
+    for _ in range(total):
+        gamepad.updateState()
+    return time.perf_counter() - t0
+
+
+def bulk(path, total):
+    gamepad = open_recording(path)
+    t0 = time.perf_counter()
+    done = 0
+    while done < total:
+        done += gamepad.updateStateBulk()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gamepad event decoding benchmark')
+    parser.add_argument('--events', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'js0.rec')
+        total = write_recording(path, args.events)
+        rates = {}
+        for name, fn in (('per_event', per_event), ('bulk', bulk)):
+            best = min(fn(path, total) for _ in range(args.repeat))
+            rates[name] = total / best
+            print('%-10s %12.0f events/s' % (name, rates[name]))
+    print('speedup    %12.2fx' % (rates['bulk'] / rates['per_event']))
+
+    if not args.no_save:
+        print('saved to %s' % save_result('gamepad_events', {
+            'events': total, 'events_per_s': rates}))
+
+
+if __name__ == '__main__':
+    main()
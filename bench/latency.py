@@ -0,0 +1,357 @@
+"""
+End-to-end command latency: from a gamepad stick change to the
+drive_motors() call that acts on it.
+
+A stand-in robot (the simulator running main.py in real time) is
+started as a separate process. The publisher side mimics
+ps3_joypub.py: a thread produces stick changes at random moments and
+either the polling loop picks up the latest one every pollInterval or
+ps3_joypub.EventPublisher sends it on change (--mode event), using
+the selected transport. Every command carries a unique
+speed value so robot side records can be matched to it.
+
+Stages (all times from the shared monotonic clock of the host):
+    poll_wait    stick change -> publisher picks it up
+    send         publisher picks it up -> robot receives it
+    parse        robot receives it -> apply_command()
+    tick_wait    apply_command() -> next drive_motors() of the main loop
+    motor_write  drive_motors() -> PWM written (with SPEED_CONTROL this
+                 includes waiting for the next wheel speed PID update)
+    total        stick change -> motors written
+
+    python -m bench.latency [--transport http|stream|udp] [--mode poll|event]
+                            [--count N]
+"""
+
+import argparse
+from array import array
+import contextvars
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from . import percentile, save_result
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOYPUB_DIR = os.path.join(ROOT, 'joystick_ctrl', 'ps3_joystk')
+STAGES = ('poll_wait', 'send', 'parse', 'tick_wait', 'motor_write', 'total')
+PORT_OFFSET = 8000
+SPEED_KEYS = 800  # distinct speed values used to tag commands
+
+sys.path.insert(0, JOYPUB_DIR)
+import Gamepad  # noqa: E402
+
+
+def speed_key(speed):
+    return round(speed * 1000)
+
+
+##################
+# Robot process  #
+##################
+
+def instrument(main, records):
+    """Wrap the command path of main.py to time each stage"""
+    recv_time = contextvars.ContextVar('recv_time', default=None)
+    pending = {}  # key -> [t_recv, t_apply]
+    state = {'recv': None}
+    serve_client = main.serve_client
+    handle_command = main.handle_command
+    apply_command = main.apply_command
+    drive_motors = main.drive_motors
+    set_mtr_spds = main.motors.set_mtr_spds
+
+    async def timed_serve_client(reader, writer):
+        recv_time.set(time.monotonic())
+        await serve_client(reader, writer)
+
+    def timed_handle_command(req_str):
+        state['recv'] = recv_time.get() or time.monotonic()
+        try:
+            return handle_command(req_str)
+        finally:
+            state['recv'] = None
+
+    def timed_apply_command(speed, steer, buttons):
+        t_recv = state['recv'] or time.monotonic()
+        apply_command(speed, steer, buttons)
+        key = speed_key(speed)
+        if key != state.get('last_key'):  # ignore heartbeat repeats
+            state['last_key'] = key
+            pending[key] = [t_recv, time.monotonic()]
+
+    def timed_drive_motors(lin_spd, ang_spd):
+        t_tick = time.monotonic()
+        drive_motors(lin_spd, ang_spd)
+        t_motor = time.monotonic()
+        key = speed_key(lin_spd)
+        if key in pending:
+            t_recv, t_apply = pending.pop(key)
+            if main.SPEED_CONTROL:  # PWM is written by the next PID update
+                state['motor_wait'] = (key, t_recv, t_apply, t_tick)
+            else:
+                records.append((key, t_recv, t_apply, t_tick, t_motor))
+
+    def timed_set_mtr_spds(a_PWM_val, b_PWM_val):
+        set_mtr_spds(a_PWM_val, b_PWM_val)
+        waiting = state.pop('motor_wait', None)
+        if waiting is not None:
+            records.append(waiting + (time.monotonic(),))
+
+    main.serve_client = timed_serve_client
+    main.handle_command = timed_handle_command
+    main.apply_command = timed_apply_command
+    main.drive_motors = timed_drive_motors
+    main.motors.set_mtr_spds = timed_set_mtr_spds
+
+
+def run_robot(out_path):
+    """Run the stand-in robot until SIGTERM, then save its records"""
+    sys.path.insert(0, ROOT)
+    from sim import Simulation
+    records = []
+    sim = Simulation(fast=False, port_offset=PORT_OFFSET)
+    sim.add_hook(lambda main: instrument(main, records))
+    signal.signal(signal.SIGTERM,
+                  lambda signum, frame: sim.loop.call_soon_threadsafe(sim.stop))
+    sim.run()
+    with open(out_path, 'w') as f:
+        json.dump(records, f)
+
+
+#####################
+# Publisher process #
+#####################
+
+class StickSimulator():
+    """Stands in for a Gamepad whose speed stick changes at random moments"""
+
+    def __init__(self, event_rate, speed_axis):
+        self.event_rate = event_rate
+        self.speed_axis = speed_axis
+        self.axisState = array('d', [0.0, 0.0])  # speed axis, any other axis
+        self.pressedState = array('B', [0])  # no buttons are ever pressed
+        self.wasPressedState = array('B', [0])
+        self.wasReleasedState = array('B', [0])
+        self.handlers = []
+        self.latest = None  # (speed, t_event) of the newest stick position
+        self.done = threading.Event()
+
+    def addAxisMovedHandler(self, name, callback):
+        if name == self.speed_axis:
+            self.handlers.append(callback)
+
+    def addButtonPressedHandler(self, name, callback):
+        pass
+
+    def axis(self, name):
+        return self.axisState[0 if name == self.speed_axis else 1]
+
+    def axisHandle(self, name):
+        return Gamepad.Gamepad.AxisHandle(self, name, 0 if name == self.speed_axis else 1)
+
+    def buttonHandle(self, name):
+        return Gamepad.Gamepad.ButtonHandle(self, name, 0)
+
+    def snapshot(self):
+        return Gamepad.Gamepad.Snapshot(axes=self.axisState[:])
+
+    def isConnected(self):
+        return not self.done.is_set()
+
+    def run(self):
+        i = 0
+        while not self.done.is_set():
+            time.sleep(random.expovariate(self.event_rate))
+            speed = (100 + i % SPEED_KEYS) / 1000
+            self.axisState[0] = -speed  # publishers invert the speed axis
+            self.latest = (speed, time.monotonic())
+            for callback in self.handlers:
+                callback(-speed)
+            i += 1
+
+
+class RecordingSender():
+    """Wraps a sender, noting when each new stick position is sent"""
+
+    def __init__(self, sender, stick, count):
+        self.sender = sender
+        self.stick = stick
+        self.count = count
+        self.sent = []  # (key, t_event, t_poll)
+        self.last = None
+
+    def send(self, values):
+        current = self.stick.latest
+        if current is not None and current is not self.last:
+            self.last = current
+            speed, t_event = current
+            self.sent.append((speed_key(speed), t_event, time.monotonic()))
+            if len(self.sent) >= self.count:
+                self.stick.done.set()
+        self.sender.send(values)
+
+
+def run_publisher(transport, mode, count, poll_interval, event_rate):
+    import joy_senders
+    import ps3_joypub
+
+    if poll_interval is None:
+        poll_interval = ps3_joypub.pollInterval
+    ports = {'http': joy_senders.http_port + PORT_OFFSET,
+             'stream': joy_senders.stream_port + PORT_OFFSET,
+             'udp': joy_senders.udp_port + PORT_OFFSET}
+    sender = {'http': joy_senders.HttpSender,
+              'stream': joy_senders.StreamSender,
+              'udp': joy_senders.UdpSender}[transport]('127.0.0.1', ports[transport])
+
+    stick = StickSimulator(event_rate, ps3_joypub.joystickSpeed)
+    recorder = RecordingSender(sender, stick, count)
+    if mode == 'event':
+        publisher = ps3_joypub.EventPublisher(stick, recorder)
+        publisher.attach()
+        threading.Thread(target=stick.run, daemon=True).start()
+        publisher.run()
+    else:
+        # same as ps3_joypub.run_polling, but only sends new positions
+        threading.Thread(target=stick.run, daemon=True).start()
+        last = None
+        while stick.isConnected():
+            time.sleep(poll_interval)
+            if stick.latest is not last:
+                last = stick.latest
+                recorder.send((-stick.axis(ps3_joypub.joystickSpeed),
+                               0.0, 0, 0, 0, 0, 0))
+    sender.send((0.0, 0.0, 0, 0, 0, 0, 0))
+    sender.close()
+    return recorder.sent, poll_interval
+
+
+def wait_for_robot(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('stand-in robot did not come up')
+
+
+############
+# Analysis #
+############
+
+def match(sent, records):
+    """Pair each robot record with the command it came from"""
+    by_key = {}
+    for key, t_event, t_poll in sent:
+        by_key.setdefault(key, []).append((t_poll, t_event))
+    samples = {stage: [] for stage in STAGES}
+    for key, t_recv, t_apply, t_tick, t_motor in records:
+        candidates = [c for c in by_key.get(key, ()) if c[0] <= t_recv]
+        if not candidates:
+            continue
+        t_poll, t_event = max(candidates)
+        for stage, value in zip(STAGES, (t_poll - t_event, t_recv - t_poll,
+                                         t_apply - t_recv, t_tick - t_apply,
+                                         t_motor - t_tick, t_motor - t_event)):
+            samples[stage].append(value * 1000)
+    return samples
+
+
+def histogram(values, width=40):
+    """Text histogram with power of two millisecond buckets"""
+    if not values:
+        return []
+    edges = [0.0]
+    edge = 0.0625
+    while edge < max(values):
+        edges.append(edge)
+        edge *= 2
+    edges.append(edge)
+    counts = [0] * (len(edges) - 1)
+    for v in values:
+        for i in range(len(counts)):
+            if v < edges[i + 1]:
+                counts[i] += 1
+                break
+    top = max(counts)
+    lines = []
+    for i, n in enumerate(counts):
+        if n:
+            bar = '#' * max(1, round(n / top * width))
+            lines.append('  %8.3f - %8.3f ms %5d %s' % (edges[i], edges[i + 1], n, bar))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gamepad to motor latency benchmark')
+    parser.add_argument('--transport', choices=('http', 'stream', 'udp'), default='http')
+    parser.add_argument('--mode', choices=('poll', 'event'), default='poll',
+                        help='ps3_joypub publish mode')
+    parser.add_argument('--count', type=int, default=200,
+                        help='number of commands to send')
+    parser.add_argument('--poll', type=float, default=None,
+                        help='publisher poll interval (default: ps3_joypub.pollInterval)')
+    parser.add_argument('--event-rate', type=float, default=20.0,
+                        help='mean stick changes per second')
+    parser.add_argument('--robot', metavar='OUT', help=argparse.SUPPRESS)
+    parser.add_argument('--no-save', action='store_true',
+                        help='do not append the result to bench/results')
+    args = parser.parse_args()
+
+    if args.robot:
+        run_robot(args.robot)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'robot.json')
+        robot = subprocess.Popen([sys.executable, '-m', 'bench.latency',
+                                  '--robot', out],
+                                 cwd=ROOT, stdout=subprocess.DEVNULL)
+        try:
+            wait_for_robot(80 + PORT_OFFSET)
+            sent, poll = run_publisher(args.transport, args.mode, args.count,
+                                       args.poll, args.event_rate)
+            time.sleep(0.5)  # let the last command reach the motors
+        finally:
+            robot.terminate()
+            robot.wait()
+        with open(out) as f:
+            records = json.load(f)
+
+    samples = match(sent, records)
+    print('transport=%s mode=%s poll=%.3fs commands=%d matched=%d'
+          % (args.transport, args.mode, poll, len(sent), len(samples['total'])))
+    summary = {}
+    for stage in STAGES:
+        values = samples[stage]
+        summary[stage] = {'p50': percentile(values, 50),
+                          'p95': percentile(values, 95),
+                          'p99': percentile(values, 99)}
+        print('%-12s p50 %8.2f  p95 %8.2f  p99 %8.2f ms'
+              % (stage, summary[stage]['p50'], summary[stage]['p95'],
+                 summary[stage]['p99']))
+        for line in histogram(values):
+            print(line)
+
+    if not args.no_save:
+        path = save_result('latency', {'transport': args.transport,
+                                       'mode': args.mode,
+                                       'poll_interval': poll,
+                                       'commands': len(sent),
+                                       'matched': len(samples['total']),
+                                       'stages_ms': summary})
+        print('saved to %s' % path)
+
+
+if __name__ == '__main__':
+    main()
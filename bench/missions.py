@@ -0,0 +1,151 @@
+"""
+Waypoint mission benchmark: drive standard missions with the
+simulator on its virtual clock (much faster than real time) and
+measure how well main.py's navigation does.
+
+Missions: the readme square (1 m sides, waypoints.txt) and random
+polylines (reproducible with --seed). Each starts at 0, 0 facing +x
+with TRIANGLE (load waypoints) and SQUARE (drive) button presses.
+
+Per mission:
+    time         SQUARE press -> navigation finished (s)
+    path         distance driven by the (true) robot (m)
+    final_err    true end position -> final waypoint (m)
+    odom_err     odometer end position -> true end position (m)
+    max_xte      peak cross-track error: largest distance of the true
+                 position from the nearest leg of the planned path (m)
+
+    python -m bench.missions [--nav-mode pursuit|stop_turn]
+                             [--random N] [--seed S]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+from . import save_result
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from sim import Simulation  # noqa: E402
+
+SQUARE = [(1, 0), (1, 1), (0, 1), (0, 0)]
+SAMPLE_DT = 0.01  # s between cross-track samples
+TIMEOUT = 120  # simulated seconds before a mission counts as failed
+
+
+def random_polyline(rng, n_points=5, size=1.5, min_leg=0.3):
+    """n_points waypoints within +-size m, legs at least min_leg long"""
+    points = []
+    prev = (0.0, 0.0)
+    while len(points) < n_points:
+        p = (round(rng.uniform(-size, size), 3), round(rng.uniform(-size, size), 3))
+        if math.dist(p, prev) >= min_leg:
+            points.append(p)
+            prev = p
+    return points
+
+
+def dist_to_segment(p, a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    seg2 = dx * dx + dy * dy
+    t = ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / seg2 if seg2 else 0.0
+    t = min(max(t, 0.0), 1.0)
+    return math.dist(p, (a[0] + t * dx, a[1] + t * dy))
+
+
+def cross_track(p, path):
+    return min(dist_to_segment(p, a, b) for a, b in zip(path, path[1:]))
+
+
+def run_mission(waypoints, params):
+    """Drive one mission in the simulator, return its measurements"""
+    result = {}
+    path = [(0.0, 0.0)] + [tuple(map(float, wp)) for wp in waypoints]
+
+    async def drive(sim):
+        main = sim.main
+        plant = sim.plant
+        await asyncio.sleep(0.5)
+        main.do_buttons((0, 1, 0, 0, 0))
+        main.do_buttons((0, 0, 1, 0, 0))
+        t0 = plant.t
+        path0 = plant.path_length
+        max_xte = 0.0
+        while main.wp_flag or main.mission.remaining():
+            if plant.t - t0 > TIMEOUT:
+                break
+            max_xte = max(max_xte, cross_track((plant.x, plant.y), path))
+            await asyncio.sleep(SAMPLE_DT)
+        x, y, _ = main.odom.get_curr_pose()
+        result.update(
+            done=not (main.wp_flag or main.mission.remaining()),
+            time=plant.t - t0,
+            path=plant.path_length - path0,
+            final_err=math.dist((plant.x, plant.y), path[-1]),
+            odom_err=math.dist((x, y), (plant.x, plant.y)),
+            max_xte=max_xte)
+        sim.stop()
+
+    with tempfile.TemporaryDirectory(prefix='picobot-mission-') as workdir:
+        with open(os.path.join(workdir, 'waypoints.txt'), 'w') as f:
+            for x, y in waypoints:
+                f.write('%s, %s\n' % (x, y))
+        sim = Simulation(fast=True, duration=TIMEOUT + 10, workdir=workdir,
+                         params=params)
+        sim.add_task(drive)
+        sim.run()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Waypoint mission benchmark')
+    parser.add_argument('--nav-mode', choices=('pursuit', 'stop_turn'),
+                        help='override NAV_MODE of parameters.py')
+    parser.add_argument('--random', type=int, default=3,
+                        help='number of random polyline missions')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-save', action='store_true',
+                        help='do not append the result to bench/results')
+    args = parser.parse_args()
+
+    params = {}
+    if args.nav_mode:
+        params['NAV_MODE'] = args.nav_mode
+    rng = random.Random(args.seed)
+    missions = [('square', SQUARE)]
+    missions += [('random%d' % i, random_polyline(rng)) for i in range(args.random)]
+
+    results = {}
+    print('%-10s %8s %8s %10s %10s %10s' % ('mission', 'time s', 'path m',
+                                           'final_err', 'odom_err', 'max_xte'))
+    t0 = time.perf_counter()
+    for name, waypoints in missions:
+        # the firmware prints its progress; keep the table readable
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                r = run_mission(waypoints, params)
+            finally:
+                sys.stdout = stdout
+        r['waypoints'] = waypoints
+        results[name] = r
+        print('%-10s %8.2f %8.3f %10.3f %10.3f %10.3f%s'
+              % (name, r['time'], r['path'], r['final_err'], r['odom_err'],
+                 r['max_xte'], '' if r['done'] else '  NOT FINISHED'))
+    print('%d missions in %.1f s wall time' % (len(missions), time.perf_counter() - t0))
+
+    if not args.no_save:
+        path = save_result('missions', {'nav_mode': args.nav_mode or 'default',
+                                        'seed': args.seed,
+                                        'missions': results})
+        print('saved to %s' % path)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ import struct
 import time
 import threading
 import inspect
+from array import array
 
 def available(joystickNumber = 0):
     """Check if a joystick is connected and ready to use."""
@@ -33,23 +34,104 @@ class Gamepad:
     EVENT_BUTTON = 'BUTTON'
     EVENT_AXIS = 'AXIS'
     fullName = 'Generic (numbers only)'
+    MAX_INDEX = 255
+
+    class ButtonHandle:
+        """A button resolved once by Gamepad.buttonHandle, reads are a single array access."""
+        __slots__ = ('name', 'index', 'pressedState', 'wasPressedState', 'wasReleasedState')
+
+        def __init__(self, gamepad, name, index):
+            self.name = name
+            self.index = index
+            self.pressedState = gamepad.pressedState
+            self.wasPressedState = gamepad.wasPressedState
+            self.wasReleasedState = gamepad.wasReleasedState
+
+        def isPressed(self):
+            """True if the button is currently pressed, see Gamepad.isPressed."""
+            return self.pressedState[self.index] != 0
+
+        def beenPressed(self):
+            """True if the button was pressed since the last beenPressed call, see Gamepad.beenPressed."""
+            if self.wasPressedState[self.index]:
+                self.wasPressedState[self.index] = 0
+                return True
+            return False
+
+        def beenReleased(self):
+            """True if the button was released since the last beenReleased call, see Gamepad.beenReleased."""
+            if self.wasReleasedState[self.index]:
+                self.wasReleasedState[self.index] = 0
+                return True
+            return False
+
+        def __repr__(self):
+            return 'ButtonHandle(%r, %d)' % (self.name, self.index)
+
+    class AxisHandle:
+        """An axis resolved once by Gamepad.axisHandle, reads are a single array access."""
+        __slots__ = ('name', 'index', 'axisState')
+
+        def __init__(self, gamepad, name, index):
+            self.name = name
+            self.index = index
+            self.axisState = gamepad.axisState
+
+        def value(self):
+            """The last observed position of the axis, see Gamepad.axis."""
+            return self.axisState[self.index]
+
+        def __repr__(self):
+            return 'AxisHandle(%r, %d)' % (self.name, self.index)
+
+    class Snapshot:
+        """The whole gamepad state at one moment, returned by Gamepad.snapshot.
+
+        axes, pressed, pressCount and releaseCount are arrays indexed by axis / button
+        number (see the index of a handle). The counts only ever increase, so presses
+        or releases between two snapshots are found by comparing them.
+        sequence increases with every update of the gamepad state."""
+        __slots__ = ('sequence', 'timestamp', 'axes', 'pressed', 'pressCount', 'releaseCount')
+
+        def __init__(self, sequence = 0, timestamp = 0, axes = None, pressed = None,
+                     pressCount = None, releaseCount = None):
+            size = Gamepad.MAX_INDEX + 1
+            self.sequence = sequence
+            self.timestamp = timestamp
+            self.axes = axes if axes is not None else array('d', [0.0]) * size
+            self.pressed = pressed if pressed is not None else array('B', [0]) * size
+            self.pressCount = pressCount if pressCount is not None else array('Q', [0]) * size
+            self.releaseCount = releaseCount if releaseCount is not None else array('Q', [0]) * size
+
+        def pressedSince(self, previous, index):
+            """True if button index was pressed between the previous snapshot and this one."""
+            return self.pressCount[index] != previous.pressCount[index]
+
+        def releasedSince(self, previous, index):
+            """True if button index was released between the previous snapshot and this one."""
+            return self.releaseCount[index] != previous.releaseCount[index]
 
     class UpdateThread(threading.Thread):
         """Thread used to continually run the updateState function on a Gamepad in the background
 
         One of these is created by the Gamepad startBackgroundUpdates function and closed by stopBackgroundUpdates"""
-        def __init__(self, gamepad):
+        def __init__(self, gamepad, bulkRead = True):
             threading.Thread.__init__(self)
             if isinstance(gamepad, Gamepad):
                 self.gamepad = gamepad
             else:
                 raise ValueError('Gamepad update thread was not created with a valid Gamepad object')
+            self.bulkRead = bulkRead
             self.running = True
 
         def run(self):
             try:
+                if self.bulkRead:
+                    update = self.gamepad.updateStateBulk
+                else:
+                    update = self.gamepad.updateState
                 while self.running:
-                    self.gamepad.updateState()
+                    update()
                 self.gamepad = None
             except:
                 self.running = False
@@ -71,10 +153,23 @@ class Gamepad:
                 else:
                     raise IOError('Could not open gamepad %s: %s' % (self.joystickNumber, str(e)))
         self.eventSize = struct.calcsize('IhBB')
+        self.eventBuffer = bytearray(self.eventSize * 256)
+        self.eventView = memoryview(self.eventBuffer)
+        self.eventBytesHeld = 0
         self.pressedMap = {}
         self.wasPressedMap = {}
         self.wasReleasedMap = {}
         self.axisMap = {}
+        # Same state indexed by button / axis number, read through handles
+        self.pressedState = array('B', [0]) * (Gamepad.MAX_INDEX + 1)
+        self.wasPressedState = array('B', [0]) * (Gamepad.MAX_INDEX + 1)
+        self.wasReleasedState = array('B', [0]) * (Gamepad.MAX_INDEX + 1)
+        self.axisState = array('d', [0.0]) * (Gamepad.MAX_INDEX + 1)
+        # Presses / releases seen so far, never reset, see snapshot
+        self.pressCount = array('Q', [0]) * (Gamepad.MAX_INDEX + 1)
+        self.releaseCount = array('Q', [0]) * (Gamepad.MAX_INDEX + 1)
+        self.snapshotBuffers = (Gamepad.Snapshot(), Gamepad.Snapshot())
+        self.snapshotFront = 0
         self.buttonNames = {}
         self.buttonIndex = {}
         self.axisNames = {}
@@ -119,6 +214,54 @@ class Gamepad:
         else:
             raise IOError('Gamepad has been disconnected')
 
+    def _getEventsRaw(self):
+        """Returns every raw event the kernel has queued, waiting for at least one.
+
+        The events are returned as a memoryview of packed 'IhBB' records
+        inside a reusable buffer, only valid until the next call.
+        Throws an IOError if the gamepad is disconnected"""
+        if not self.connected:
+            raise IOError('Gamepad has been disconnected')
+        try:
+            count = self.joystickFile.readinto1(self.eventView[self.eventBytesHeld:])
+        except IOError as e:
+            self.connected = False
+            raise IOError('Gamepad %s disconnected: %s' % (self.joystickNumber, str(e)))
+        if not count:
+            self.connected = False
+            raise IOError('Gamepad %s disconnected' % self.joystickNumber)
+        return self._takeEvents(count)
+
+    def _getEventsRawNonBlocking(self):
+        """As _getEventsRaw, but returns an empty view instead of waiting.
+
+        Reads the file descriptor directly, so it must be in non-blocking mode
+        and must not have been read through the buffered file object before.
+        Throws an IOError if the gamepad is disconnected"""
+        if not self.connected:
+            raise IOError('Gamepad has been disconnected')
+        try:
+            count = os.readv(self.joystickFile.fileno(), [self.eventView[self.eventBytesHeld:]])
+        except BlockingIOError:
+            return self.eventView[:0]
+        except OSError as e:
+            self.connected = False
+            raise IOError('Gamepad %s disconnected: %s' % (self.joystickNumber, str(e)))
+        if not count:
+            self.connected = False
+            raise IOError('Gamepad %s disconnected' % self.joystickNumber)
+        return self._takeEvents(count)
+
+    def _takeEvents(self, count):
+        """Returns the whole events in the buffer after count new bytes arrived."""
+        total = self.eventBytesHeld + count
+        whole = total - (total % self.eventSize)
+        self.eventBytesHeld = total - whole
+        if self.eventBytesHeld:
+            # keep a partial event for the next read
+            self.eventBuffer[:self.eventBytesHeld] = self.eventView[whole:total]
+        return self.eventView[:whole]
+
     def _rawEventToDescription(self, event):
         """Decodes the raw event from getNextEventRaw into a formatted string."""
         timestamp, value, eventType, index = event
@@ -190,14 +333,19 @@ class Gamepad:
             if value == 0:
                 finalValue = False
                 self.wasReleasedMap[index] = True
+                self.wasReleasedState[index] = 1
+                self.releaseCount[index] += 1
                 for callback in self.releasedEventMap[index]:
                     callback()
             else:
                 finalValue = True
                 self.wasPressedMap[index] = True
+                self.wasPressedState[index] = 1
+                self.pressCount[index] += 1
                 for callback in self.pressedEventMap[index]:
                     callback()
             self.pressedMap[index] = finalValue
+            self.pressedState[index] = finalValue
             for callback in self.changedEventMap[index]:
                 callback(finalValue)
         elif eventType == Gamepad.EVENT_CODE_AXIS:
@@ -208,6 +356,7 @@ class Gamepad:
                 entityName = index
             finalValue = value / Gamepad.MAX_AXIS
             self.axisMap[index] = finalValue
+            self.axisState[index] = finalValue
             for callback in self.movedEventMap[index]:
                 callback(finalValue)
         elif eventType == Gamepad.EVENT_CODE_INIT_BUTTON:
@@ -223,6 +372,9 @@ class Gamepad:
             self.pressedMap[index] = finalValue
             self.wasPressedMap[index] = False
             self.wasReleasedMap[index] = False
+            self.pressedState[index] = finalValue
+            self.wasPressedState[index] = 0
+            self.wasReleasedState[index] = 0
             self.pressedEventMap[index] = []
             self.releasedEventMap[index] = []
             self.changedEventMap[index] = []
@@ -235,10 +387,12 @@ class Gamepad:
                 entityName = index
             finalValue = value / Gamepad.MAX_AXIS
             self.axisMap[index] = finalValue
+            self.axisState[index] = finalValue
             self.movedEventMap[index] = []
             skip = skipInit
         else:
             skip = True
+        self._publishSnapshot()
 
         if skip:
             return self.getNextEvent()
@@ -249,26 +403,29 @@ class Gamepad:
         """Updates the internal button and axis states with the next pending event.
 
         This call waits for a new event if there are not any waiting to be processed."""
+        pending = []
         self.lastTimestamp, value, eventType, index = self._getNextEventRaw()
         if eventType == Gamepad.EVENT_CODE_BUTTON:
             if value == 0:
                 finalValue = False
                 self.wasReleasedMap[index] = True
-                for callback in self.releasedEventMap[index]:
-                    callback()
+                self.wasReleasedState[index] = 1
+                self.releaseCount[index] += 1
+                pending.append((self.releasedEventMap[index], ()))
             else:
                 finalValue = True
                 self.wasPressedMap[index] = True
-                for callback in self.pressedEventMap[index]:
-                    callback()
+                self.wasPressedState[index] = 1
+                self.pressCount[index] += 1
+                pending.append((self.pressedEventMap[index], ()))
             self.pressedMap[index] = finalValue
-            for callback in self.changedEventMap[index]:
-                callback(finalValue)
+            self.pressedState[index] = finalValue
+            pending.append((self.changedEventMap[index], (finalValue,)))
         elif eventType == Gamepad.EVENT_CODE_AXIS:
             finalValue = value / Gamepad.MAX_AXIS
             self.axisMap[index] = finalValue
-            for callback in self.movedEventMap[index]:
-                callback(finalValue)
+            self.axisState[index] = finalValue
+            pending.append((self.movedEventMap[index], (finalValue,)))
         elif eventType == Gamepad.EVENT_CODE_INIT_BUTTON:
             if value == 0:
                 finalValue = False
@@ -277,23 +434,153 @@ class Gamepad:
             self.pressedMap[index] = finalValue
             self.wasPressedMap[index] = False
             self.wasReleasedMap[index] = False
+            self.pressedState[index] = finalValue
+            self.wasPressedState[index] = 0
+            self.wasReleasedState[index] = 0
             self.pressedEventMap[index] = []
             self.releasedEventMap[index] = []
             self.changedEventMap[index] = []
         elif eventType == Gamepad.EVENT_CODE_INIT_AXIS:
             finalValue = value / Gamepad.MAX_AXIS
             self.axisMap[index] = finalValue
+            self.axisState[index] = finalValue
             self.movedEventMap[index] = []
+        self._publishSnapshot()
+        self._runCallbacks(pending)
+
+    def updateStateBulk(self):
+        """Updates the internal button and axis states with every pending event.
 
-    def startBackgroundUpdates(self, waitForReady = True):
+        All events queued by the kernel are read with one call and applied in a single pass.
+        Returns the number of events processed.
+
+        This call waits for a new event if there are not any waiting to be processed."""
+        return self._applyEvents(self._getEventsRaw())
+
+    def updateStateNonBlocking(self):
+        """Updates the internal button and axis states with every pending event, without waiting.
+
+        Returns the number of events processed, 0 if none were waiting.
+        Requires the gamepad file to be in non-blocking mode, see GamepadReactor."""
+        return self._applyEvents(self._getEventsRawNonBlocking())
+
+    def _applyEvents(self, events):
+        """Applies a buffer of packed raw events to the state maps, returns the event count."""
+        if not len(events):
+            return 0
+        pressedMap = self.pressedMap
+        wasPressedMap = self.wasPressedMap
+        wasReleasedMap = self.wasReleasedMap
+        axisMap = self.axisMap
+        pressedState = self.pressedState
+        wasPressedState = self.wasPressedState
+        wasReleasedState = self.wasReleasedState
+        axisState = self.axisState
+        pressCount = self.pressCount
+        releaseCount = self.releaseCount
+        pressedEventMap = self.pressedEventMap
+        releasedEventMap = self.releasedEventMap
+        changedEventMap = self.changedEventMap
+        movedEventMap = self.movedEventMap
+        maxAxis = Gamepad.MAX_AXIS
+        pending = []
+        count = 0
+        for timestamp, value, eventType, index in struct.iter_unpack('IhBB', events):
+            count += 1
+            if eventType == Gamepad.EVENT_CODE_AXIS:
+                finalValue = value / maxAxis
+                axisMap[index] = finalValue
+                axisState[index] = finalValue
+                if movedEventMap[index]:
+                    pending.append((movedEventMap[index], (finalValue,)))
+            elif eventType == Gamepad.EVENT_CODE_BUTTON:
+                if value == 0:
+                    finalValue = False
+                    wasReleasedMap[index] = True
+                    wasReleasedState[index] = 1
+                    releaseCount[index] += 1
+                    if releasedEventMap[index]:
+                        pending.append((releasedEventMap[index], ()))
+                else:
+                    finalValue = True
+                    wasPressedMap[index] = True
+                    wasPressedState[index] = 1
+                    pressCount[index] += 1
+                    if pressedEventMap[index]:
+                        pending.append((pressedEventMap[index], ()))
+                pressedMap[index] = finalValue
+                pressedState[index] = finalValue
+                if changedEventMap[index]:
+                    pending.append((changedEventMap[index], (finalValue,)))
+            elif eventType == Gamepad.EVENT_CODE_INIT_BUTTON:
+                pressedMap[index] = value != 0
+                wasPressedMap[index] = False
+                wasReleasedMap[index] = False
+                pressedState[index] = value != 0
+                wasPressedState[index] = 0
+                wasReleasedState[index] = 0
+                pressedEventMap[index] = []
+                releasedEventMap[index] = []
+                changedEventMap[index] = []
+            elif eventType == Gamepad.EVENT_CODE_INIT_AXIS:
+                axisMap[index] = value / maxAxis
+                axisState[index] = value / maxAxis
+                movedEventMap[index] = []
+        self.lastTimestamp = timestamp
+        self._publishSnapshot()
+        self._runCallbacks(pending)
+        return count
+
+    def _runCallbacks(self, pending):
+        """Calls the (callbacks, arguments) pairs queued while applying events."""
+        for callbacks, args in pending:
+            for callback in callbacks:
+                callback(*args)
+
+    def _publishSnapshot(self):
+        """Copies the current state into the back snapshot buffer and makes it the front one.
+
+        Only the update thread calls this. The sequence number of the buffer is odd
+        while it is being written, so snapshot can detect a copy that overlapped a write."""
+        front = self.snapshotFront ^ 1
+        buffer = self.snapshotBuffers[front]
+        sequence = self.snapshotBuffers[self.snapshotFront].sequence + 2
+        buffer.sequence = sequence - 1
+        buffer.timestamp = self.lastTimestamp
+        buffer.axes[:] = self.axisState
+        buffer.pressed[:] = self.pressedState
+        buffer.pressCount[:] = self.pressCount
+        buffer.releaseCount[:] = self.releaseCount
+        buffer.sequence = sequence
+        self.snapshotFront = front
+
+    def snapshot(self):
+        """Returns every axis, button state and press / release count as one consistent Snapshot.
+
+        The state is the one after the last update call (updateState, updateStateBulk ...)
+        finished applying its events. Callbacks run after the snapshot is published,
+        so a snapshot taken from a callback already includes the event it was called for.
+        Never waits for the update thread."""
+        while True:
+            buffer = self.snapshotBuffers[self.snapshotFront]
+            sequence = buffer.sequence
+            if sequence & 1:
+                continue
+            snapshot = Gamepad.Snapshot(sequence, buffer.timestamp, buffer.axes[:], buffer.pressed[:],
+                                        buffer.pressCount[:], buffer.releaseCount[:])
+            if buffer.sequence == sequence:
+                return snapshot
+
+    def startBackgroundUpdates(self, waitForReady = True, bulkRead = True):
         """Starts a background thread which keeps the gamepad state updated automatically.
         This allows for asynchronous gamepad updates and event callback code.
+        With bulkRead all queued events are read and applied in one go (see updateStateBulk).
 
         Do not use with getNextEvent"""
         if self.updateThread is not None:
             if self.updateThread.running:
                 raise RuntimeError('Called startBackgroundUpdates when the update thread is already running')
-        self.updateThread = Gamepad.UpdateThread(self)
+        self.updateThread = Gamepad.UpdateThread(self, bulkRead)
         self.updateThread.start()
         if waitForReady:
             while not self.isReady() and self.connected:
@@ -348,11 +635,10 @@ class Gamepad:
                 buttonIndex = self.buttonIndex[buttonName]
             else:
                 buttonIndex = int(buttonName)
-            if self.wasPressedMap[buttonIndex]:
-                self.wasPressedMap[buttonIndex] = False
-                return True
-            else:
-                return False
+            wasPressed = self.wasPressedMap[buttonIndex] and self.wasPressedState[buttonIndex]
+            self.wasPressedMap[buttonIndex] = False
+            self.wasPressedState[buttonIndex] = 0
+            return bool(wasPressed)
         except KeyError:
             raise ValueError('Button %i was not found' % buttonIndex)
         except ValueError:
@@ -368,11 +654,10 @@ class Gamepad:
                 buttonIndex = self.buttonIndex[buttonName]
             else:
                 buttonIndex = int(buttonName)
-            if self.wasReleasedMap[buttonIndex]:
-                self.wasReleasedMap[buttonIndex] = False
-                return True
-            else:
-                return False
+            wasReleased = self.wasReleasedMap[buttonIndex] and self.wasReleasedState[buttonIndex]
+            self.wasReleasedMap[buttonIndex] = False
+            self.wasReleasedState[buttonIndex] = 0
+            return bool(wasReleased)
         except KeyError:
             raise ValueError('Button %i was not found' % buttonIndex)
         except ValueError:
@@ -396,6 +681,39 @@ class Gamepad:
         except ValueError:
             raise ValueError('Axis name %s was not found' % axisName)
 
+    def buttonHandle(self, buttonName):
+        """Resolves a button specified by name or index once, returning a ButtonHandle.
+        The handle has isPressed, beenPressed and beenReleased methods which
+        read the state without any name lookups.
+
+        Throws ValueError if the button name or index cannot be found."""
+        if buttonName in self.buttonIndex:
+            buttonIndex = self.buttonIndex[buttonName]
+        else:
+            try:
+                buttonIndex = int(buttonName)
+            except ValueError:
+                raise ValueError('Button name %s was not found' % buttonName)
+        if not 0 <= buttonIndex <= Gamepad.MAX_INDEX:
+            raise ValueError('Button %i was not found' % buttonIndex)
+        return Gamepad.ButtonHandle(self, buttonName, buttonIndex)
+
+    def axisHandle(self, axisName):
+        """Resolves an axis specified by name or index once, returning an AxisHandle.
+        The handle has a value method which reads the position without any name lookups.
+
+        Throws ValueError if the axis name or index cannot be found."""
+        if axisName in self.axisIndex:
+            axisIndex = self.axisIndex[axisName]
+        else:
+            try:
+                axisIndex = int(axisName)
+            except ValueError:
+                raise ValueError('Axis name %s was not found' % axisName)
+        if not 0 <= axisIndex <= Gamepad.MAX_INDEX:
+            raise ValueError('Axis %i was not found' % axisIndex)
+        return Gamepad.AxisHandle(self, axisName, axisIndex)
+
     def availableButtonNames(self):
         """Returns a list of available button names for this gamepad.
         An empty list means that no button mapping has been provided."""
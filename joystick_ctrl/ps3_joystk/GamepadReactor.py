@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Serve any number of gamepads from one background thread.
+
+Instead of a blocking UpdateThread per Gamepad, the reactor puts every
+gamepad file in non-blocking mode and waits on all of them at once with
+selectors (epoll on Linux). Stopping wakes the thread immediately, and
+watched joystick numbers are (re)opened when the device appears. Opening
+a gamepad may block for seconds, so it is done on a short lived thread
+of its own while the reactor keeps serving the other gamepads.
+
+    reactor = GamepadReactor()
+    reactor.watch(0, Gamepad.PS3, onConnect=lambda gamepad: ...)
+    reactor.watch(1, Gamepad.Xbox360)
+    reactor.start()
+    ...
+    reactor.stop()
+
+Do not mix with startBackgroundUpdates, getNextEvent or updateState on
+the same gamepads.
+"""
+
+import os
+import selectors
+import threading
+
+import Gamepad
+
+
+class GamepadReactor:
+    def __init__(self, hotplugInterval = 1.0):
+        self.hotplugInterval = hotplugInterval
+        self.selector = selectors.DefaultSelector()
+        self.gamepads = {}  # fd -> Gamepad
+        self.watched = {}  # joystick number -> (gamepad type, onConnect, onDisconnect)
+        self.opening = set()  # joystick numbers being opened
+        self.opened = []  # gamepads opened, not served yet
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.wakeRead, self.wakeWrite = os.pipe()
+        os.set_blocking(self.wakeRead, False)
+        self.selector.register(self.wakeRead, selectors.EVENT_READ)
+
+    def add(self, gamepad):
+        """Serve an already opened gamepad."""
+        fd = gamepad.joystickFile.fileno()
+        os.set_blocking(fd, False)
+        with self.lock:
+            self.gamepads[fd] = gamepad
+            self.selector.register(fd, selectors.EVENT_READ, gamepad)
+        self._wake()
+
+    def remove(self, gamepad):
+        """Stop serving a gamepad, it is left open."""
+        with self.lock:
+            for fd, served in list(self.gamepads.items()):
+                if served is gamepad:
+                    self.selector.unregister(fd)
+                    del self.gamepads[fd]
+
+    def watch(self, joystickNumber, gamepadType = Gamepad.Gamepad, onConnect = None, onDisconnect = None):
+        """Open /dev/input/js<joystickNumber> with gamepadType whenever it is plugged in.
+
+        onConnect(gamepad) is called (on the reactor thread) after each open,
+        onDisconnect(gamepad) when the device goes away."""
+        with self.lock:
+            self.watched[int(joystickNumber)] = (gamepadType, onConnect, onDisconnect)
+        self._wake()
+
+    def connectedGamepads(self):
+        """Returns a list of the gamepads currently being served."""
+        with self.lock:
+            return list(self.gamepads.values())
+
+    def start(self):
+        """Start serving in a background thread."""
+        if self.thread is not None and self.thread.is_alive():
+            raise RuntimeError('Called start when the reactor is already running')
+        self.running = True
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
+
+    def stop(self, timeout = None):
+        """Stop the background thread, returning once it has finished."""
+        self.running = False
+        self._wake()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def close(self):
+        """Stop and disconnect every gamepad."""
+        self.stop()
+        with self.lock:
+            opened, self.opened = self.opened, []
+        for gamepad in opened:
+            gamepad.disconnect()
+        for gamepad in self.connectedGamepads():
+            self.remove(gamepad)
+            gamepad.disconnect()
+        self.selector.close()
+        os.close(self.wakeRead)
+        os.close(self.wakeWrite)
+
+    def _wake(self):
+        try:
+            os.write(self.wakeWrite, b'\0')
+        except BlockingIOError:
+            pass
+
+    def _open(self, joystickNumber, gamepadType):
+        """Open a gamepad (on its own thread), the reactor serves it once opened."""
+        try:
+            gamepad = gamepadType(joystickNumber)
+        except IOError:
+            gamepad = None
+        with self.lock:
+            self.opening.discard(joystickNumber)
+            if gamepad is not None and not self.running:
+                gamepad.disconnect()  # stopped meanwhile
+                return
+            if gamepad is not None:
+                self.opened.append(gamepad)
+        self._wake()
+
+    def _hotplug(self):
+        with self.lock:
+            opened, self.opened = self.opened, []
+        for gamepad in opened:
+            self.add(gamepad)
+            with self.lock:
+                watch = self.watched.get(int(gamepad.joystickNumber))
+            if watch is not None and watch[1] is not None:
+                watch[1](gamepad)
+        with self.lock:
+            busyNumbers = set(int(gamepad.joystickNumber) for gamepad in self.gamepads.values())
+            busyNumbers |= self.opening
+            watched = list(self.watched.items())
+        for joystickNumber, (gamepadType, onConnect, onDisconnect) in watched:
+            if joystickNumber in busyNumbers or not Gamepad.available(joystickNumber):
+                continue
+            with self.lock:
+                self.opening.add(joystickNumber)
+            threading.Thread(target = self._open, args = (joystickNumber, gamepadType),
+                             daemon = True).start()
+
+    def _dropped(self, fd, gamepad):
+        self.remove(gamepad)
+        gamepad.disconnect()
+        with self.lock:
+            watch = self.watched.get(int(gamepad.joystickNumber))
+        if watch is not None and watch[2] is not None:
+            watch[2](gamepad)
+
+    def run(self):
+        """Serve the gamepads until stop is called."""
+        while self.running:
+            self._hotplug()
+            for key, mask in self.selector.select(self.hotplugInterval):
+                if key.fd == self.wakeRead:
+                    try:
+                        os.read(self.wakeRead, 64)
+                    except BlockingIOError:
+                        pass
+                    continue
+                gamepad = key.data
+                try:
+                    gamepad.updateStateNonBlocking()
+                except IOError:
+                    self._dropped(key.fd, gamepad)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Download the flight recorder of the picobot (rec/dump route of
+pico_code/main.py) and save it, or print it as text.
+
+    python flight_rec.py [--freeze] [--host HOST] [--port PORT] [file]
+
+Without a file the records are printed. --freeze stops the robot's
+recorder first, so it keeps the run being looked into.
+"""
+
+import argparse
+import collections
+import struct
+import urllib.request
+from joy_senders import robot_host, http_port
+
+Record = collections.namedtuple(
+    'Record', 'us enc_a enc_b x y theta lin_spd ang_spd pwm_a pwm_b '
+              'late_us exec_us wp_flag')
+
+
+def request(route, host=robot_host, port=http_port, timeout=5.0):
+    """GET a recorder route, return (body, headers)"""
+    url = "http://%s:%d/%s" % (host, port, route)
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read(), response.headers
+
+
+def fetch(host=robot_host, port=http_port):
+    """Download the recording, return (blob, record format)"""
+    blob, headers = request('rec/dump', host, port)
+    return blob, headers['X-Record-Format']
+
+
+def decode(blob, rec_format):
+    """List of Record, oldest first"""
+    return [Record._make(values)
+            for values in struct.iter_unpack(rec_format, blob)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('file', nargs='?', help='save the raw records here')
+    parser.add_argument('--freeze', action='store_true',
+                        help='freeze the recorder before downloading')
+    parser.add_argument('--host', default=robot_host)
+    parser.add_argument('--port', type=int, default=http_port)
+    args = parser.parse_args()
+
+    if args.freeze:
+        print(request('rec/freeze', args.host, args.port)[0].decode().strip())
+    blob, rec_format = fetch(args.host, args.port)
+    if args.file:
+        with open(args.file, 'wb') as f:
+            f.write(blob)
+        print("%d records (%s) saved to %s"
+              % (len(blob) // struct.calcsize(rec_format), rec_format, args.file))
+        return
+    for r in decode(blob, rec_format):
+        print("%10d enc=%7d %7d  x=%7.3f y=%7.3f th=%6.3f  cmd=%5.2f %5.2f  "
+              "pwm=%6d %6d  late=%5d exec=%5d  wp=%d" % r)
+
+
+if __name__ == '__main__':
+    main()
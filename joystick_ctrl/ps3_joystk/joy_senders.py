@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Transports used by ps3_joypub.py to deliver joystick commands
+to the picobot.
+
+Every sender has a send(values) method where values is the tuple
+    (speed, steer, first, second, third, home, p3)
+and a close() method. Async senders have a coroutine send() instead.
+"""
+
+import asyncio
+import socket
+import struct
+import time
+import urllib.request
+
+robot_host = "192.168.1.64"
+http_port = 80
+stream_port = 8080  # must match STREAM_PORT in pico_code/parameters.py
+udp_port = 5005  # must match UDP_PORT in pico_code/parameters.py
+
+# UDP command datagram, must match CMD_FORMAT in pico_code/main.py
+cmd_format = '<IhhB'
+cmd_scale = 32767
+
+
+def format_path(values):
+    """Encode a command tuple as speed/steer/b1/b2/b3/b4/p3"""
+    return "%s/%s/%s/%s/%s/%s/%s" % values
+
+
+class HttpSender():
+    """Send each command as a separate HTTP GET request."""
+
+    def __init__(self, host=robot_host, port=http_port, timeout=1.0):
+        self.base_url = "http://%s:%d/" % (host, port)
+        self.timeout = timeout
+
+    def send(self, values):
+        url = self.base_url + format_path(values)
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            response.read()
+
+    def close(self):
+        pass
+
+
+class AsyncHttpSender():
+    """
+    Send each command as an HTTP GET request without blocking the
+    event loop. Connecting and waiting for the reply are bounded by
+    connect_timeout and read_timeout; asyncio.TimeoutError is raised
+    when either expires.
+    """
+
+    def __init__(self, host=robot_host, port=http_port,
+                 connect_timeout=0.5, read_timeout=0.5):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    async def send(self, values):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        try:
+            request = "GET /%s HTTP/1.0\r\nHost: %s\r\n\r\n" % (
+                format_path(values), self.host)
+            writer.write(request.encode())
+            await asyncio.wait_for(writer.drain(), self.read_timeout)
+            await asyncio.wait_for(reader.read(), self.read_timeout)
+        finally:
+            writer.close()
+
+    def close(self):
+        pass
+
+
+class StreamSender():
+    """
+    Send commands over one long-lived TCP connection.
+
+    Each frame is a line speed/steer/b1/b2/b3/b4/p3/seq and the robot
+    answers every frame with a line seq/status. The round trip time of
+    the last acknowledged frame is kept in self.rtt (seconds).
+    A broken connection is re-opened on the next send.
+    """
+
+    def __init__(self, host=robot_host, port=stream_port,
+                 timeout=1.0, retry_interval=1.0):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.sock = None
+        self.reader = None
+        self.seq = 0
+        self.rtt = None
+        self.next_retry = 0.0
+
+    def connect(self):
+        self.sock = socket.create_connection(self.address, self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        print("Stream connected to %s:%d" % self.address)
+
+    def send(self, values):
+        if self.sock is None:
+            if time.monotonic() < self.next_retry:
+                return
+            try:
+                self.connect()
+            except OSError as e:
+                print("Stream connect failed: %s" % e)
+                self.next_retry = time.monotonic() + self.retry_interval
+                return
+        self.seq += 1
+        frame = "%s/%d\n" % (format_path(values), self.seq)
+        try:
+            t0 = time.monotonic()
+            self.sock.sendall(frame.encode())
+            reply = self.reader.readline()
+            if not reply:
+                raise OSError("connection closed by robot")
+            seq, _, status = reply.decode().strip().partition('/')
+            if int(seq) == self.seq:
+                self.rtt = time.monotonic() - t0
+            if status != "OK":
+                print("Robot: %s" % status)
+        except (OSError, ValueError) as e:
+            print("Stream dropped: %s" % e)
+            self.close()
+
+    def close(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+        self.sock = None
+        self.reader = None
+
+
+class AsyncStreamSender():
+    """
+    Send commands over one long-lived TCP connection without blocking
+    the event loop, framed and acknowledged like StreamSender.
+    Connecting and waiting for the acknowledgement are bounded by
+    connect_timeout and read_timeout; asyncio.TimeoutError is raised
+    when either expires. A failed connection is closed and re-opened
+    on the next send.
+    """
+
+    def __init__(self, host=robot_host, port=stream_port,
+                 connect_timeout=0.5, read_timeout=0.5):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.reader = None
+        self.writer = None
+        self.seq = 0
+        self.rtt = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        print("Stream connected to %s:%d" % (self.host, self.port))
+
+    async def send(self, values):
+        if self.writer is None:
+            await self.connect()
+        self.seq += 1
+        frame = "%s/%d\n" % (format_path(values), self.seq)
+        try:
+            t0 = time.monotonic()
+            self.writer.write(frame.encode())
+            await asyncio.wait_for(self.writer.drain(), self.read_timeout)
+            reply = await asyncio.wait_for(self.reader.readline(),
+                                           self.read_timeout)
+            if not reply:
+                raise OSError("connection closed by robot")
+            seq, _, status = reply.decode().strip().partition('/')
+            if int(seq) == self.seq:
+                self.rtt = time.monotonic() - t0
+            if status != "OK":
+                print("Robot: %s" % status)
+        except (asyncio.TimeoutError, OSError):
+            # a late reply would be read as the next frame's: start over
+            self.close()
+            raise
+        except ValueError as e:
+            self.close()
+            raise OSError("bad reply from robot: %s" % e)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+
+class UdpSender():
+    """
+    Send each command as one fixed size datagram:
+        seq (u32), speed, steer (i16), button bits (u8)
+    Lost datagrams are never retransmitted; the robot drops any
+    datagram older than the newest one it has applied.
+    The sequence starts from the millisecond clock so that a
+    restarted publisher is still newer than its previous run.
+    """
+
+    def __init__(self, host=robot_host, port=udp_port):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.seq = int(time.time() * 1000) & 0xFFFFFFFF
+        self.packet = bytearray(struct.calcsize(cmd_format))
+
+    def send(self, values):
+        speed, steer = values[:2]
+        bits = 0
+        for i, button in enumerate(values[2:]):
+            if button:
+                bits |= 1 << i
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        struct.pack_into(cmd_format, self.packet, 0, self.seq,
+                         round(max(-1.0, min(1.0, speed)) * cmd_scale),
+                         round(max(-1.0, min(1.0, steer)) * cmd_scale),
+                         bits)
+        try:
+            self.sock.sendto(self.packet, self.address)
+        except OSError as e:
+            print("UDP send failed: %s" % e)
+
+    def close(self):
+        self.sock.close()
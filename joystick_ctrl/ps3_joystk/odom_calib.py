@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Calibrate TRACK_WIDTH and WHEEL_CIRC (pico_code/parameters.py) from
+the encoder counts of a recorded run around a known loop.
+
+    python odom_calib.py LOG --length 4 --turn 270
+
+LOG is a telem_recorder.py log directory or a flight recorder dump
+(flight_rec.py run.bin). The Odometer.update math is replayed on the
+recorded encoder counts for a whole grid of (track width, wheel
+circumference) pairs at once, broadcast over (pairs x samples) with
+no Python loop over either. Each pair is scored by how well it
+closes the loop:
+    distance of the end point from --end (default: back at 0, 0)
+  + difference of the path length from --length
+  + difference of the total turn from --turn, 1 m per radian.
+Without --length only the track width is swept: the wheel
+circumference scales the whole path, so closure alone can not
+determine it.
+
+For the readme's 1 m square (waypoints.txt), starting at 0, 0 facing
++x, the robot drives 4 m, turns 270 degrees and stops back at 0, 0.
+The replay assumes the run starts at the first sample, so the log
+must begin at pose 0, 0, 0 (reset the odometer first); a log that
+starts elsewhere, e.g. a flight recorder dump that lost the start of
+a run longer than REC_RECORDS control ticks, is rejected. The replay
+also assumes the wheels moved on an arc between samples (exact for
+straight legs and turns in place), so record curved runs at a high
+rate.
+The grid is evaluated a block of track widths at a time, using
+about --max-mb megabytes.
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+
+PICO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), 'pico_code')
+sys.path.insert(0, PICO_DIR)
+from parameters import TRACK_WIDTH, WHEEL_CIRC, TICKS_PER_REV
+from recorder import REC_FORMAT
+from flight_rec import Record
+
+ANGLE_WEIGHT = 1.0  # score meters per radian of heading error
+START_TOL = 0.01  # m and rad, largest first pose still taken as 0, 0, 0
+BYTES_PER_ELEMENT = 48  # float64 temporaries of sweep per pair and sample
+
+# numpy equivalents of the struct format characters used on the robot
+STRUCT_DTYPES = {'I': 'u4', 'i': 'i4', 'H': 'u2', 'h': 'i2', 'B': 'u1',
+                 'f': 'f4'}
+
+
+def struct_dtype(fmt, names):
+    """Packed numpy dtype of a little endian struct format"""
+    assert fmt[0] == '<', fmt
+    return np.dtype([(name, '<' + STRUCT_DTYPES[c])
+                     for name, c in zip(names, fmt[1:])])
+
+
+def load_log(path):
+    """(enc_a, enc_b) count arrays and the first (x, y, theta) pose
+    of a telemetry log or recorder dump"""
+    if os.path.isdir(path):
+        from telem_recorder import TelemetryLog
+        log = TelemetryLog(path)
+    else:
+        log = np.fromfile(path, dtype=struct_dtype(REC_FORMAT, Record._fields))
+    if not len(log['enc_a']):
+        return log['enc_a'], log['enc_b'], None
+    return (log['enc_a'], log['enc_b'],
+            tuple(float(log[name][0]) for name in ('x', 'y', 'theta')))
+
+
+def sweep(enc_a, enc_b, track_widths, wheel_circs,
+          ticks_per_rev=TICKS_PER_REV, max_bytes=64 << 20):
+    """
+    Replay Odometer.update over the encoder samples for every pair
+    of track_widths (M) and wheel_circs (K).
+    Returns the final x, y, theta and the path length, each (M, K).
+    Blocks of track widths are broadcast at a time so the temporary
+    (block, K, samples) arrays stay within about max_bytes.
+    """
+    da = np.diff(np.asarray(enc_a, dtype=np.int64)).astype(float)
+    db = np.diff(np.asarray(enc_b, dtype=np.int64)).astype(float)
+    track_widths = np.asarray(track_widths, dtype=float)
+    mpt = np.asarray(wheel_circs, dtype=float)[None, :, None] / ticks_per_rev
+    per_tw = BYTES_PER_ELEMENT * mpt.size * max(len(da), 1)
+    block = max(1, int(max_bytes // per_tw))
+    parts = [_sweep_block(da, db, track_widths[i:i + block, None, None], mpt)
+             for i in range(0, len(track_widths), block)]
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def _sweep_block(da, db, tw, mpt):
+    """sweep of the track widths tw (M, 1, 1) and meters per tick
+    mpt (1, K, 1)"""
+    dist = (da + db) / 2 * mpt  # (1, K, N)
+    dang = (db - da) * mpt / tw  # (M, K, N)
+    ang = np.cumsum(dang, axis=-1)
+    mid = ang - dang / 2
+    # chord of the arc: 2 * dist * sin(dang / 2) / dang
+    chord = dist * np.sinc(dang / (2 * np.pi))
+    x = np.sum(chord * np.cos(mid), axis=-1)
+    y = np.sum(chord * np.sin(mid), axis=-1)
+    theta = ang[..., -1] if ang.shape[-1] else np.zeros(x.shape)
+    length = np.broadcast_to(np.sum(np.abs(dist), axis=-1), x.shape)
+    return x, y, theta, length
+
+
+def score(x, y, theta, length, end=(0.0, 0.0), turn=None, path_length=None):
+    """Loop closure error of each pair (smaller is better)"""
+    err = np.hypot(x - end[0], y - end[1])
+    if path_length is not None:
+        err = err + np.abs(length - path_length)
+    if turn is not None:
+        err = err + ANGLE_WEIGHT * np.abs(theta - turn)
+    return err
+
+
+def grid(nominal, spread, n):
+    return np.linspace(nominal * (1 - spread), nominal * (1 + spread), n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('log', help='telemetry log directory or recorder dump')
+    parser.add_argument('--end', type=float, nargs=2, default=(0.0, 0.0),
+                        metavar=('X', 'Y'), help='true end point (m)')
+    parser.add_argument('--turn', type=float,
+                        help='true total turn (degrees, + is CCW)')
+    parser.add_argument('--length', type=float, help='true path length (m)')
+    parser.add_argument('--spread', type=float, default=0.1,
+                        help='grid range, fraction of the current values')
+    parser.add_argument('--n', type=int, default=81, help='grid points per axis')
+    parser.add_argument('--max-mb', type=float, default=64,
+                        help='memory for the grid evaluation (MB)')
+    args = parser.parse_args()
+
+    enc_a, enc_b, start = load_log(args.log)
+    if start is None:
+        parser.error('%s holds no samples' % args.log)
+    if max(abs(v) for v in start) > START_TOL:
+        parser.error('%s starts at pose %.3f, %.3f, %.3f, not at 0, 0, 0: '
+                     'reset the odometer before the run and record all of '
+                     'it (the flight recorder keeps only the last '
+                     'REC_RECORDS control ticks)' % ((args.log,) + start))
+    max_bytes = int(args.max_mb * (1 << 20))
+    track_widths = grid(TRACK_WIDTH, args.spread, args.n)
+    if args.length is None:
+        wheel_circs = np.array([WHEEL_CIRC])
+    else:
+        wheel_circs = grid(WHEEL_CIRC, args.spread, args.n)
+    turn = None if args.turn is None else np.radians(args.turn)
+
+    x, y, theta, length = sweep(enc_a, enc_b, track_widths, wheel_circs,
+                                max_bytes=max_bytes)
+    err = score(x, y, theta, length, args.end, turn, args.length)
+    i, k = np.unravel_index(np.argmin(err), err.shape)
+
+    now = sweep(enc_a, enc_b, [TRACK_WIDTH], [WHEEL_CIRC])
+    now_err = score(*now, args.end, turn, args.length)[0, 0]
+
+    print("%d samples, %d x %d pairs" % (len(enc_a), len(track_widths),
+                                         len(wheel_circs)))
+    for label, tw, wc, pose, e in (
+            ('current', TRACK_WIDTH, WHEEL_CIRC,
+             [v[0, 0] for v in now], now_err),
+            ('best', track_widths[i], wheel_circs[k],
+             [v[i, k] for v in (x, y, theta, length)], err[i, k])):
+        print("%-8s TRACK_WIDTH = %.4f  WHEEL_CIRC = %.4f  "
+              "end %.3f, %.3f  turn %.1f deg  length %.3f m  score %.4f"
+              % (label, tw, wc, pose[0], pose[1], np.degrees(pose[2]),
+                 pose[3], e))
+    if i in (0, len(track_widths) - 1) or (
+            len(wheel_circs) > 1 and k in (0, len(wheel_circs) - 1)):
+        print("best pair is at the edge of the grid, try a larger --spread")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,11 +6,20 @@ Use PS3 joystick with Piborg Gamepad library (asynchronous mode)
 to send speed & steering values to picobot webserver.
 """
 
+import asyncio
 import Gamepad
+import threading
 import time
-import urllib.request
+import joy_senders
 
-base_url = "http://192.168.1.64/%s/%s/%s/%s/%s/%s/%s"
+# Transport: 'http' (one GET per command), 'stream' (keep-alive socket)
+# or 'udp' (sequenced datagrams)
+transport = 'stream'
+
+# Publish mode: 'poll' (send every pollInterval),
+# 'event' (send as soon as an input changes) or
+# 'async' (like event, on asyncio, dropping superseded commands)
+publishMode = 'event'
 
 # Gamepad settings
 gamepadType = Gamepad.PS3
@@ -23,64 +32,301 @@ joystickSpeed = 'LEFT-Y'
 joystickSteering = 'RIGHT-X'
 pollInterval = 0.2
 
-if __name__ == "__main__":
+# Event mode settings
+minInterval = 0.02  # merge bursts of axis events into one frame per 20 ms
+heartbeatInterval = 0.5  # resend current state when inputs are idle
 
-    # Wait for gamepad to be connected
-    if not Gamepad.available():
-        print('Please connect your gamepad...')
-        while not Gamepad.available():
-            time.sleep(1.0)
-    gamepad = gamepadType()
-    print('%s connected' % gamepad)
+# Async mode settings
+connectTimeout = 0.5
+readTimeout = 0.5
 
-    # Set some initial states
-    speed = 0.0
-    steer = 0.0
-    first = 0
-    second = 0
-    third = 0
-    home = 0
-    p3 = 0
+statsInterval = 10.0  # print publisher counters and round trip time
 
-    # Start the background updating
-    gamepad.startBackgroundUpdates()
+# Buttons in the order they appear in a command
+commandButtons = (cir, tri, sqr, crs, ps3)
+
+
+def make_sender(transport=transport, host=joy_senders.robot_host):
+    if transport == 'http':
+        return joy_senders.HttpSender(host)
+    elif transport == 'stream':
+        return joy_senders.StreamSender(host)
+    elif transport == 'udp':
+        return joy_senders.UdpSender(host)
+    else:
+        raise ValueError('Unknown transport %s' % transport)
+
+
+def command_inputs(gamepad):
+    """Resolve the inputs used in a command once, returns
+    (speed axis, steering axis, button handles)"""
+    return (gamepad.axisHandle(joystickSpeed),
+            gamepad.axisHandle(joystickSteering),
+            tuple(gamepad.buttonHandle(name) for name in commandButtons))
 
+
+class CommandBuilder():
+    """
+    Build each command from one gamepad snapshot, so speed, steer and
+    button presses all come from the same moment. A button counts as
+    pressed if it was pressed since the previous command was built.
+    """
+
+    def __init__(self, gamepad):
+        speedAxis, steerAxis, buttonHandles = command_inputs(gamepad)
+        self.gamepad = gamepad
+        self.speedIndex = speedAxis.index
+        self.steerIndex = steerAxis.index
+        self.buttonIndices = tuple(button.index for button in buttonHandles)
+        self.previous = gamepad.snapshot()
+
+    def next(self):
+        snapshot = self.gamepad.snapshot()
+        previous = self.previous
+        self.previous = snapshot
+        buttons = tuple(int(snapshot.pressedSince(previous, index))
+                        for index in self.buttonIndices)
+        return (-snapshot.axes[self.speedIndex],
+                -snapshot.axes[self.steerIndex]) + buttons
+
+
+def format_rtt(sender):
+    """Round trip time of the sender's last acknowledged frame"""
+    rtt = getattr(sender, 'rtt', None)
+    if rtt is None:
+        return 'rtt=-'
+    return 'rtt=%.1fms' % (rtt * 1000)
+
+
+def run_polling(gamepad, sender):
+    """Send the joystick state every pollInterval"""
+    commands = CommandBuilder(gamepad)
+    sent = 0
+    nextStats = time.monotonic() + statsInterval
     while True:
         if gamepad.isConnected():
-            # Check to see if any buttons pressed
-            if gamepad.beenPressed(cir):
-                first = 1
-            else:
-                first = 0
+            values = commands.next()
+            sender.send(values)
+            sent += 1
+        if time.monotonic() >= nextStats:
+            print('sent=%d %s' % (sent, format_rtt(sender)))
+            nextStats += statsInterval
 
-            if gamepad.beenPressed(tri):
-                second = 1
-            else:
-                second = 0
+        time.sleep(pollInterval)
 
-            if gamepad.beenPressed(sqr):
-                third = 1
-            else:
-                third = 0
 
-            if gamepad.beenPressed(crs):
-                home = 1
-            else:
-                home = 0
+class EventPublisher():
+    """
+    Send a command as soon as a stick moves or a button is pressed.
+
+    Gamepad callbacks run on the background update thread, so they only
+    mark the state as changed; sending happens on the calling thread of
+    run(), which builds each frame from one gamepad snapshot. Axis
+    events arriving within minInterval of the previous frame are merged
+    into one frame. When nothing changes the current state is re-sent
+    every heartbeatInterval so the robot knows we are alive.
+    """
+
+    def __init__(self, gamepad, sender, minInterval=minInterval,
+                 heartbeatInterval=heartbeatInterval):
+        self.gamepad = gamepad
+        self.commands = CommandBuilder(gamepad)
+        self.sender = sender
+        self.minInterval = minInterval
+        self.heartbeatInterval = heartbeatInterval
+        self.changed = threading.Condition()
+        self.dirty = False
+        self.lastSent = 0.0
+        self.framesSent = 0
+
+    def attach(self):
+        """Register the gamepad callbacks.
+        Waits until the gamepad has reported all the inputs we use."""
+        while True:
+            try:
+                self.gamepad.addAxisMovedHandler(joystickSpeed, self._axisMoved)
+                self.gamepad.addAxisMovedHandler(joystickSteering, self._axisMoved)
+                for name in commandButtons:
+                    self.gamepad.addButtonPressedHandler(name, self._changed)
+                return
+            except ValueError:
+                time.sleep(0.1)
 
-            if gamepad.beenPressed(ps3):
-                p3 = 1
+    def _axisMoved(self, position):
+        self._changed()
+
+    def _changed(self):
+        with self.changed:
+            self.dirty = True
+            self.changed.notify()
+
+    def _waitForFrame(self):
+        """Block until a frame is due"""
+        with self.changed:
+            while True:
+                if self.dirty:
+                    due = self.lastSent + self.minInterval
+                else:
+                    due = self.lastSent + self.heartbeatInterval
+                wait = due - time.monotonic()
+                if wait <= 0:
+                    break
+                self.changed.wait(wait)
+            self.dirty = False
+            self.lastSent = time.monotonic()
+
+    def stats(self):
+        return 'sent=%d %s' % (self.framesSent, format_rtt(self.sender))
+
+    def run(self):
+        nextStats = time.monotonic() + statsInterval
+        while self.gamepad.isConnected():
+            self._waitForFrame()
+            self.sender.send(self.commands.next())
+            self.framesSent += 1
+            if time.monotonic() >= nextStats:
+                print(self.stats())
+                nextStats += statsInterval
+
+
+def make_async_sender(transport=transport, host=joy_senders.robot_host):
+    if transport == 'http':
+        return joy_senders.AsyncHttpSender(host, connect_timeout=connectTimeout,
+                                           read_timeout=readTimeout)
+    elif transport == 'stream':
+        return joy_senders.AsyncStreamSender(host, connect_timeout=connectTimeout,
+                                             read_timeout=readTimeout)
+    elif transport == 'udp':
+        return joy_senders.UdpSender(host)  # sendto never blocks
+    else:
+        raise ValueError('Unknown transport %s' % transport)
+
+
+class AsyncPublisher():
+    """
+    Event driven publisher on asyncio where only the newest command
+    is ever waiting to be sent.
+
+    At most one command is in flight. A command submitted while another
+    is in flight waits in a single slot; a newer command replaces it and
+    the replaced one is counted as dropped. Button presses of a dropped
+    command are carried over so they are never lost.
+    Counters: sent, dropped (superseded), timedOut and failed.
+    """
+
+    def __init__(self, gamepad, sender, heartbeatInterval=heartbeatInterval):
+        self.gamepad = gamepad
+        self.commands = CommandBuilder(gamepad)
+        self.sender = sender
+        self.heartbeatInterval = heartbeatInterval
+        self.pending = None
+        self.wakeup = None
+        self.lastSubmit = 0.0
+        self.sent = 0
+        self.dropped = 0
+        self.timedOut = 0
+        self.failed = 0
+
+    def attach(self, loop):
+        """Register gamepad callbacks that hand over to the event loop"""
+        def changed(*args):
+            loop.call_soon_threadsafe(self.submit)
+        while True:
+            try:
+                self.gamepad.addAxisMovedHandler(joystickSpeed, changed)
+                self.gamepad.addAxisMovedHandler(joystickSteering, changed)
+                for name in commandButtons:
+                    self.gamepad.addButtonPressedHandler(name, changed)
+                return
+            except ValueError:
+                time.sleep(0.1)
+
+    def submit(self):
+        """Queue the current gamepad state, replacing any unsent command"""
+        values = self.commands.next()
+        if self.pending is not None:
+            self.dropped += 1
+            values = values[:2] + tuple(a or b for a, b in zip(values[2:], self.pending[2:]))
+        self.pending = values
+        self.lastSubmit = time.monotonic()
+        self.wakeup.set()
+
+    def stats(self):
+        return 'sent=%d dropped=%d timed_out=%d failed=%d %s' % (
+            self.sent, self.dropped, self.timedOut, self.failed,
+            format_rtt(self.sender))
+
+    async def _send(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            values = self.pending
+            self.pending = None
+            try:
+                result = self.sender.send(values)
+                if asyncio.iscoroutine(result):
+                    await result
+                self.sent += 1
+            except asyncio.TimeoutError:
+                self.timedOut += 1
+            except OSError as e:
+                self.failed += 1
+                print('Send failed: %s' % e)
+
+    async def _heartbeat(self):
+        while True:
+            wait = self.lastSubmit + self.heartbeatInterval - time.monotonic()
+            if wait <= 0:
+                self.submit()
             else:
-                p3 = 0
+                await asyncio.sleep(wait)
 
-            # Check joystick coordinates
-            speed = -gamepad.axis(joystickSpeed)
-            steer = -gamepad.axis(joystickSteering)
-            values = (speed, steer, first, second, third, home, p3)
-            with urllib.request.urlopen(base_url % values) as response:
-                html = response.read()
+    async def _report(self):
+        while True:
+            await asyncio.sleep(statsInterval)
+            print(self.stats())
 
-        time.sleep(pollInterval)
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        self.attach(asyncio.get_running_loop())
+        tasks = [asyncio.create_task(self._send()),
+                 asyncio.create_task(self._heartbeat()),
+                 asyncio.create_task(self._report())]
+        try:
+            while self.gamepad.isConnected():
+                await asyncio.sleep(1.0)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+if __name__ == "__main__":
+
+    # Wait for gamepad to be connected
+    if not Gamepad.available():
+        print('Please connect your gamepad...')
+        while not Gamepad.available():
+            time.sleep(1.0)
+    gamepad = gamepadType()
+    print('%s connected' % gamepad)
+    if publishMode == 'async':
+        sender = make_async_sender()
+    else:
+        sender = make_sender()
+
+    # Start the background updating
+    gamepad.startBackgroundUpdates()
 
-    gamepad.disconnect()
-    print("node stopped")
+    try:
+        if publishMode == 'event':
+            publisher = EventPublisher(gamepad, sender)
+            publisher.attach()
+            publisher.run()
+        elif publishMode == 'async':
+            asyncio.run(AsyncPublisher(gamepad, sender).run())
+        else:
+            run_polling(gamepad, sender)
+    finally:
+        sender.close()
+        gamepad.disconnect()
+        print("node stopped")
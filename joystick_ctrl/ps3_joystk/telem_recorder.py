@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Record the picobot telemetry stream (see telemetry.py) to disk
+for long sessions, and load such logs with NumPy.
+
+    python telem_recorder.py LOGDIR [host] [port]
+
+records until Ctrl-C. A log is a directory holding one raw binary
+file per field (LOGDIR/<field>.bin, dtype given in meta.json) plus
+the column t: robot time in seconds since the first frame, with the
+wraparound of the robot's ms clock removed.
+
+Frames are received straight into a preallocated NumPy batch and
+each field is appended to its file a batch at a time, so no Python
+objects are created per frame. TelemetryLog opens a log with
+np.memmap (no copy, however long the session):
+
+    log = TelemetryLog('LOGDIR')
+    part = log.time_slice(10.0, 20.0)   # dict of column views
+    even = log.resample(50)             # 50 Hz, interpolated
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+import numpy as np
+from joy_senders import robot_host
+from telemetry import telem_port, telem_format, telem_size
+
+# must match telem_format, packed without padding
+frame_dtype = np.dtype([
+    ('seq', '<u4'), ('ms', '<u4'),
+    ('x', '<f4'), ('y', '<f4'), ('theta', '<f4'),
+    ('enc_a', '<i4'), ('enc_b', '<i4'),
+    ('pwm_a', '<i4'), ('pwm_b', '<i4'),
+    ('wp_flag', 'u1')])
+assert frame_dtype.itemsize == telem_size, telem_format
+
+MS_PERIOD = 1 << 30  # robot ticks_ms() wraps at 2**30
+META_FILE = 'meta.json'
+
+
+class ColumnWriter():
+    """
+    Append frame batches to the column files of a log directory.
+    meta.json is rewritten after every batch, so a log cut short
+    (crash, power loss) is still readable up to its last batch.
+    """
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = [(name, frame_dtype[name].str) for name in frame_dtype.names]
+        self.columns.append(('t', '<f8'))
+        self.files = {name: open(os.path.join(path, name + '.bin'), 'wb')
+                      for name, _ in self.columns}
+        self.count = 0
+        self.t_ms = 0  # unwrapped time of the last frame
+        self.last_ms = None
+        self.started = time.time()
+
+    def append(self, batch):
+        """Append a structured array of frames"""
+        if not len(batch):
+            return
+        ms = batch['ms'].astype(np.int64)
+        prev = ms[0] if self.last_ms is None else self.last_ms
+        steps = np.diff(ms, prepend=prev) % MS_PERIOD
+        t_ms = self.t_ms + np.cumsum(steps)
+        self.t_ms = int(t_ms[-1])
+        self.last_ms = int(ms[-1])
+        for name in frame_dtype.names:
+            batch[name].tofile(self.files[name])
+        (t_ms / 1000.0).tofile(self.files['t'])
+        for f in self.files.values():
+            f.flush()
+        self.count += len(batch)
+        self.write_meta()
+
+    def write_meta(self):
+        meta = {'count': self.count,
+                'columns': self.columns,
+                'format': telem_format,
+                'started': self.started}
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def record(path, host=robot_host, port=telem_port, batch_size=256,
+           flush_interval=1.0):
+    """
+    Receive telemetry into log directory path until the robot
+    closes the connection (or KeyboardInterrupt). A batch is written
+    when full or flush_interval seconds after the previous write.
+    Returns the number of frames recorded.
+    """
+    batch = np.zeros(batch_size, dtype=frame_dtype)
+    view = memoryview(batch.view(np.uint8))
+    nbytes = batch_size * telem_size
+    writer = ColumnWriter(path)
+    sock = socket.create_connection((host, port), 2.0)
+    sock.settimeout(flush_interval)
+    got = 0
+    last_flush = time.monotonic()
+    try:
+        while True:
+            try:
+                n = sock.recv_into(view[got:])
+                if not n:
+                    break
+                got += n
+            except socket.timeout:
+                pass
+            if got == nbytes or time.monotonic() - last_flush >= flush_interval:
+                frames = got // telem_size
+                writer.append(batch[:frames])
+                # carry a partial frame over to the start of the batch
+                rest = got - frames * telem_size
+                view[:rest] = view[frames * telem_size:got]
+                got = rest
+                last_flush = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.append(batch[:got // telem_size])
+        writer.close()
+        sock.close()
+    return writer.count
+
+
+class TelemetryLog():
+    """
+    A log directory written by record(), opened read-only with
+    np.memmap. Columns are attributes (log.x, log.t, ...) and
+    items (log['x']) holding the whole session.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.count = self.meta['count']
+        self.columns = {}
+        for name, dtype in self.meta['columns']:
+            if self.count:
+                col = np.memmap(os.path.join(path, name + '.bin'),
+                                dtype=dtype, mode='r', shape=(self.count,))
+            else:
+                col = np.zeros(0, dtype=dtype)
+            self.columns[name] = col
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['columns'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def time_slice(self, t0=None, t1=None):
+        """Columns of the frames with t0 <= t < t1 (views, no copy)"""
+        t = self.columns['t']
+        i0 = 0 if t0 is None else np.searchsorted(t, t0, 'left')
+        i1 = self.count if t1 is None else np.searchsorted(t, t1, 'left')
+        return {name: col[i0:i1] for name, col in self.columns.items()}
+
+    def resample(self, hz, t0=None, t1=None):
+        """
+        Columns at evenly spaced times (hz per second) from t0 to t1.
+        Float columns are interpolated linearly, integer columns
+        (counts, flags) take the value of the last frame at or before
+        each time.
+        """
+        t = self.columns['t']
+        if not self.count:
+            return {name: col[:0] for name, col in self.columns.items()}
+        t0 = t[0] if t0 is None else t0
+        t1 = t[-1] if t1 is None else t1
+        times = np.arange(t0, t1, 1.0 / hz)
+        idx = np.clip(np.searchsorted(t, times, 'right') - 1, 0, self.count - 1)
+        out = {'t': times}
+        for name, col in self.columns.items():
+            if name == 't':
+                continue
+            if col.dtype.kind == 'f':
+                out[name] = np.interp(times, t, col)
+            else:
+                out[name] = col[idx]
+        return out
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    path = sys.argv[1]
+    host = sys.argv[2] if len(sys.argv) > 2 else robot_host
+    port = int(sys.argv[3]) if len(sys.argv) > 3 else telem_port
+    print("Recording to %s, Ctrl-C to stop" % path)
+    count = record(path, host, port)
+    print("%d frames recorded" % count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+"""
+Receive the binary telemetry stream of the picobot (serve_telem
+in pico_code/main.py) and print it, or use TelemetryClient to get
+decoded frames:
+
+    with TelemetryClient() as client:
+        for frame in client:
+            print(frame.x, frame.y, frame.theta)
+"""
+
+import collections
+import socket
+import struct
+import sys
+from joy_senders import robot_host
+
+telem_port = 8081  # must match TELEM_PORT in pico_code/parameters.py
+
+# must match TELEM_FORMAT in pico_code/main.py
+telem_format = '<IIfffiiiiB'
+telem_size = struct.calcsize(telem_format)
+
+Frame = collections.namedtuple(
+    'Frame', 'seq ms x y theta enc_a enc_b pwm_a pwm_b wp_flag')
+
+
+class TelemetryClient():
+    """
+    Subscribe to the telemetry stream. Iterating yields Frame
+    tuples until the robot closes the connection. The robot skips
+    frames rather than queueing them when the client falls behind;
+    gaps in seq count the frames missed (see skipped).
+    """
+
+    def __init__(self, host=robot_host, port=telem_port, timeout=2.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.buf = bytearray(telem_size)
+        self.view = memoryview(self.buf)
+        self.last_seq = None
+        self.skipped = 0
+
+    def read_frame(self):
+        """Next Frame, or None when the connection is closed"""
+        got = 0
+        while got < telem_size:
+            n = self.sock.recv_into(self.view[got:])
+            if not n:
+                return None
+            got += n
+        frame = Frame._make(struct.unpack_from(telem_format, self.buf))
+        if self.last_seq is not None:
+            self.skipped += (frame.seq - self.last_seq - 1) & 0xFFFFFFFF
+        self.last_seq = frame.seq
+        return frame
+
+    def __iter__(self):
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    host = sys.argv[1] if len(sys.argv) > 1 else robot_host
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else telem_port
+    with TelemetryClient(host, port) as client:
+        for f in client:
+            print("%6d %10d  x=%7.3f y=%7.3f th=%6.3f  enc=%7d %7d  "
+                  "pwm=%6d %6d  wp=%d  skipped=%d"
+                  % (f.seq, f.ms, f.x, f.y, f.theta, f.enc_a, f.enc_b,
+                     f.pwm_a, f.pwm_b, f.wp_flag, client.skipped))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Time Odometer.update() against FastOdometer.update() on the Pico.
+
+Copy to the Pico together with odometer.py, fast_odometer.py,
+encoder_rp2.py and parameters.py, then run it from the REPL
+(import bench_odometer). The encoder counts are stepped by the
+loop itself, so the wheels need not turn.
+Prints microseconds per update and heap bytes allocated per update.
+"""
+
+import gc
+import time
+from odometer import Odometer
+from fast_odometer import FastOdometer
+
+N = 2000
+
+
+def bench(odom, n=N):
+    pos_a = odom.enc_a._pos
+    pos_b = odom.enc_b._pos
+    update = odom.update
+    gc.collect()
+    free = gc.mem_free()
+    t0 = time.ticks_us()
+    for i in range(n):
+        pos_a[0] = i
+        pos_b[0] = i + (i >> 2)  # gentle left curve
+        update()
+    elapsed = time.ticks_diff(time.ticks_us(), t0)
+    allocated = free - gc.mem_free()
+    return elapsed / n, allocated / n
+
+
+def empty_loop(odom, n=N):
+    """Cost of the loop & encoder stepping alone"""
+    pos_a = odom.enc_a._pos
+    pos_b = odom.enc_b._pos
+    t0 = time.ticks_us()
+    for i in range(n):
+        pos_a[0] = i
+        pos_b[0] = i + (i >> 2)
+    return time.ticks_diff(time.ticks_us(), t0) / n
+
+
+for cls in (Odometer, FastOdometer):
+    odom = cls()
+    us, alloc = bench(odom)
+    us -= empty_loop(odom)
+    print("%-12s %7.1f us/update %7.1f bytes/update  (max %d Hz)  pose %s"
+          % (cls.__name__, us, alloc, 1_000_000 / us, odom.get_curr_pose()))
@@ -0,0 +1,224 @@
+"""
+Real-time loop for the second core of the RP2040 (DUAL_CORE in
+parameters.py).
+
+Core 1 runs odometry and wheel speed control in a tight fixed rate
+loop; core 0 keeps uasyncio, the network servers and navigation.
+The loop only does integer arithmetic on preallocated arrays, so it
+never allocates and never waits for the garbage collector.
+
+Core 0 -> core 1: target tick rates in the cmd array, guarded by a
+lock. Core 1 only tries to take it (non-blocking) and keeps its
+previous targets when core 0 holds it.
+Core 1 -> core 0: the pose in the FastOdometer state array, read by
+get_curr_pose() under its sequence lock.
+"""
+
+import _thread
+import time
+from array import array
+import fast_odometer
+from velocity import WheelSpeed
+from motors import MAX_PWM, direction
+from parameters import (SPD_KP, SPD_KI, SPD_KD, SPD_KF, SPD_KS,
+                        SPD_I_MAX, SPD_WINDOW_US, CORE1_HZ)
+
+# cmd array layout
+RUN = 0  # loop runs while nonzero
+TARGET_A = 1  # target tick rates
+TARGET_B = 2
+RESET = 3  # nonzero: reset the odometer to (0, 0, 0)
+
+# stats array layout
+LOOPS = 0
+OVERRUNS = 1
+MAX_EXEC_US = 2
+
+
+class IntSpeedPID():
+    """motors.SpeedPID in integer arithmetic, gains scaled by 256"""
+
+    def __init__(self, hz):
+        self.hz = hz
+        self.kp = int(SPD_KP * 256)
+        self.ki = int(SPD_KI * 256)
+        self.kd = int(SPD_KD * 256)
+        self.kf = int(SPD_KF * 256)
+        self.ks = int(SPD_KS)
+        self.i_max = int(SPD_I_MAX) << 8
+        self.out_max = MAX_PWM
+        self.reset()
+
+    def reset(self):
+        self.integral = 0  # PWM * 256
+        self.prev_measured = 0
+
+    def update(self, target, measured):
+        error = target - measured
+        if target > 0:
+            ff = self.ks
+        elif target < 0:
+            ff = -self.ks
+        else:
+            ff = 0
+        deriv = self.kd * (self.prev_measured - measured) * self.hz
+        self.prev_measured = measured
+        integral = self.integral + self.ki * error // self.hz
+        if integral > self.i_max:
+            integral = self.i_max
+        elif integral < -self.i_max:
+            integral = -self.i_max
+        out = ff + ((self.kf * target + self.kp * error + integral + deriv) >> 8)
+        if out > self.out_max:
+            out = self.out_max
+            if error < 0:
+                self.integral = integral
+        elif out < -self.out_max:
+            out = -self.out_max
+            if error > 0:
+                self.integral = integral
+        else:
+            self.integral = integral
+        return out
+
+
+class Core1():
+    """
+    Odometry and closed loop motor control on core 1.
+
+    Offers the same set_targets() / stop() as motors.Motors, so
+    drive_motors works unchanged. start() launches the loop,
+    shutdown() ends it (call before a soft reset, or core 1 stays
+    busy). Should the loop fail, it switches the motors off, clears
+    running and keeps the exception in error for core 0 to report.
+    """
+
+    def __init__(self, odom, set_mtr_dirs, set_mtr_spds, hz=CORE1_HZ):
+        self.odom = odom
+        self.set_mtr_dirs = set_mtr_dirs
+        self.set_mtr_spds = set_mtr_spds
+        self.hz = hz
+        self.cmd = array('i', (0, 0, 0, 0))
+        self.stats = array('i', (0, 0, 0))
+        self.lock = _thread.allocate_lock()
+        self.pid_a = IntSpeedPID(hz)
+        self.pid_b = IntSpeedPID(hz)
+        self.spd_a = WheelSpeed(odom.enc_a, SPD_WINDOW_US)
+        self.spd_b = WheelSpeed(odom.enc_b, SPD_WINDOW_US)
+        self.running = False
+        self.error = None  # exception that ended the loop
+
+    # core 0 side
+
+    def set_targets(self, a_tps, b_tps):
+        with self.lock:
+            self.cmd[TARGET_A] = int(a_tps)
+            self.cmd[TARGET_B] = int(b_tps)
+
+    def stop(self):
+        self.set_targets(0, 0)
+
+    def reset_odometer(self):
+        with self.lock:
+            self.cmd[RESET] = 1
+
+    def start(self):
+        self.cmd[RUN] = 1
+        self.error = None
+        self.running = True
+        _thread.start_new_thread(self.run, ())
+
+    def shutdown(self, timeout_ms=100):
+        """Stop the motors and end the loop, waiting at most
+        timeout_ms for core 1 to finish"""
+        if self.running:
+            self.stop()
+            self.cmd[RUN] = 0
+            start = time.ticks_ms()
+            while self.running:
+                if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                    print("core1: no response to shutdown")
+                    break
+                time.sleep_ms(1)
+        self.set_mtr_dirs('OFF', 'OFF')
+        self.set_mtr_spds(0, 0)
+
+    def stats_line(self):
+        if self.error is not None:
+            return "core1: stopped by %r" % self.error
+        return "core1: %d Hz loops=%d overruns=%d max_exec=%dus" % (
+            self.hz, self.stats[LOOPS], self.stats[OVERRUNS],
+            self.stats[MAX_EXEC_US])
+
+    # core 1 side
+
+    def _reset_odometer(self):
+        s = self.odom.state
+        s[fast_odometer.SEQ] = (s[fast_odometer.SEQ] + 1) & 0x3FFFFFFF
+        s[fast_odometer.PREV_A] = self.odom.enc_a._pos[0]
+        s[fast_odometer.PREV_B] = self.odom.enc_b._pos[0]
+        s[fast_odometer.X] = 0
+        s[fast_odometer.Y] = 0
+        s[fast_odometer.X_REM] = 0
+        s[fast_odometer.Y_REM] = 0
+        s[fast_odometer.TICK_DIFF] = 0
+        s[fast_odometer.SEQ] = (s[fast_odometer.SEQ] + 1) & 0x3FFFFFFF
+
+    def run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.set_mtr_dirs('OFF', 'OFF')
+            self.set_mtr_spds(0, 0)
+            self.running = False
+
+    def _loop(self):
+        cmd = self.cmd
+        stats = self.stats
+        lock = self.lock
+        update_odom = self.odom._update
+        period = 1_000_000 // self.hz
+        target_a = 0
+        target_b = 0
+        active = False
+        deadline = time.ticks_us()
+        while cmd[RUN]:
+            start = time.ticks_us()
+            if lock.acquire(0):
+                target_a = cmd[TARGET_A]
+                target_b = cmd[TARGET_B]
+                reset = cmd[RESET]
+                cmd[RESET] = 0
+                lock.release()
+                if reset:
+                    self._reset_odometer()
+            update_odom()
+
+            if target_a or target_b:
+                if not active:
+                    self.pid_a.reset()
+                    self.pid_b.reset()
+                    active = True
+                a_out = self.pid_a.update(target_a, self.spd_a.speed())
+                b_out = self.pid_b.update(target_b, self.spd_b.speed())
+                self.set_mtr_dirs(direction(a_out), direction(b_out))
+                self.set_mtr_spds(abs(a_out), abs(b_out))
+            elif active:
+                active = False
+                self.set_mtr_dirs('OFF', 'OFF')
+                self.set_mtr_spds(0, 0)
+
+            now = time.ticks_us()
+            exec_us = time.ticks_diff(now, start)
+            if exec_us > stats[MAX_EXEC_US]:
+                stats[MAX_EXEC_US] = exec_us
+            stats[LOOPS] += 1
+            deadline = time.ticks_add(deadline, period)
+            wait = time.ticks_diff(deadline, now)
+            if wait > 0:
+                time.sleep_us(wait)
+            else:
+                stats[OVERRUNS] += 1
+                deadline = now
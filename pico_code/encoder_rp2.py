@@ -9,6 +9,7 @@
 from machine import Pin
 from array import array
 import rp2
+import time
 
 # Test with encoder on pins 2 and 3:
 #e = Encoder(0, Pin(2))
@@ -35,15 +36,58 @@ def make_isr(pos):
             p[0] = x
     return isr
 
+# As make_isr, also recording when each edge was seen and the position
+# after it in a ring buffer (length a power of 2). head[0] counts the
+# edges written, wrapping at 2**30. Edges drained from the FIFO in one
+# interrupt share its timestamp.
+def make_timed_isr(pos, times, positions, head):
+    old_x = array('i', (0,))
+    mask = len(times) - 1
+    ticks_us = time.ticks_us
+    @micropython.viper
+    def isr(sm):
+        i = ptr32(pos)
+        p = ptr32(old_x)
+        t = ptr32(times)
+        q = ptr32(positions)
+        h = ptr32(head)
+        m : int = int(mask)
+        now : int = int(ticks_us())
+        while sm.rx_fifo():
+            v : int = int(sm.get()) & 3
+            x : int = v & 1
+            y : int = v >> 1
+            s : int = 1 if (x ^ y) else -1
+            i[0] = i[0] + (s if (x ^ p[0]) else (0 - s))
+            p[0] = x
+            n : int = h[0]
+            t[n & m] = now
+            q[n & m] = i[0]
+            h[0] = (n + 1) & 0x3FFFFFFF
+    return isr
+
 # Args:
 # StateMachine no. (0-7): each instance must have a different sm_no.
 # An initialised input Pin: this and the next pin are the encoder interface.
+# ring_size: if nonzero, keep the time and position of the last edges
+# (rounded up to a power of 2), see velocity.WheelSpeed.
 class Encoder:
-    def __init__(self, sm_no, base_pin, scale=1):
+    def __init__(self, sm_no, base_pin, scale=1, ring_size=0):
         self.scale = scale
         self._pos = array("i", (0,))  # [pos]
+        self.ring_size = 0
+        if ring_size:
+            self.ring_size = 2
+            while self.ring_size < ring_size:
+                self.ring_size <<= 1
+            self._times = array("i", (0 for _ in range(self.ring_size)))
+            self._positions = array("i", (0 for _ in range(self.ring_size)))
+            self._head = array("i", (0,))  # [edges written]
+            isr = make_timed_isr(self._pos, self._times, self._positions, self._head)
+        else:
+            isr = make_isr(self._pos)
         self.sm = rp2.StateMachine(sm_no, self.pio_quadrature, in_base=base_pin)
-        self.sm.irq(make_isr(self._pos))  # Instantiate the closure
+        self.sm.irq(isr)  # Instantiate the closure
         self.sm.exec("set(y, 99)")  # Initialise y: guarantee different to the input
         self.sm.active(1)
 
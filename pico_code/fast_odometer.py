@@ -0,0 +1,111 @@
+import math
+from array import array
+from odometer import Odometer
+from parameters import TRACK_WIDTH, METERS_PER_TICK
+
+# heading as a 32 bit binary angle: a full turn is 2**32 units
+TABLE_BITS = 10  # cosine table entries per turn = 2**TABLE_BITS
+TABLE_SIZE = 1 << TABLE_BITS
+Q = 14  # fixed point fraction bits of the cosine table
+BAM_PER_TICK = round(METERS_PER_TICK / TRACK_WIDTH / (2 * math.pi) * 2**32)
+
+# state array layout
+PREV_A = 0  # last encoder values
+PREV_B = 1
+X = 2  # position in half ticks
+Y = 3
+X_REM = 4  # position fraction, Q14 half ticks
+Y_REM = 5
+TICK_DIFF = 6  # cumulative (b - a) ticks, proportional to heading
+K = 7  # BAM_PER_TICK
+SEQ = 8  # odd while update() is writing, see get_curr_pose()
+
+
+def make_cos_table():
+    """Q14 cosine of each table angle, one extra entry for interpolation"""
+    return array('i', (round(math.cos(2 * math.pi * i / TABLE_SIZE) * (1 << Q))
+                       for i in range(TABLE_SIZE + 1)))
+
+
+# Closure enables Viper to retain state (see encoder_rp2.make_isr)
+def make_update(pos_a, pos_b, state, cos_table):
+    @micropython.viper
+    def update():
+        s = ptr32(state)
+        pa = ptr32(pos_a)
+        pb = ptr32(pos_b)
+        t = ptr32(cos_table)
+        s[8] = (s[8] + 1) & 0x3FFFFFFF
+        a: int = pa[0]
+        b: int = pb[0]
+        da: int = a - s[0]
+        db: int = b - s[1]
+        s[0] = a
+        s[1] = b
+
+        # heading before and after, wrapping multiply keeps it modulo one turn
+        k: int = s[7]
+        old: int = s[6] * k
+        s[6] = s[6] + db - da
+        new: int = s[6] * k
+        mid: int = old + ((new - old) >> 1)
+
+        # interpolated cos & sin of the midpoint heading
+        i: int = (mid >> 22) & 1023
+        f: int = (mid >> 8) & 0x3FFF
+        c: int = t[i] + (((t[i + 1] - t[i]) * f + 8192) >> 14)
+        j: int = (i - 256) & 1023
+        sn: int = t[j] + (((t[j + 1] - t[j]) * f + 8192) >> 14)
+
+        # distance traveled in half ticks, the Q14 remainder is carried over
+        d: int = da + db
+        rx: int = s[4] + d * c
+        ry: int = s[5] + d * sn
+        s[2] = s[2] + (rx >> 14)
+        s[3] = s[3] + (ry >> 14)
+        s[4] = rx & 0x3FFF
+        s[5] = ry & 0x3FFF
+        s[8] = (s[8] + 1) & 0x3FFFFFFF
+    return update
+
+
+class FastOdometer(Odometer):
+    """
+    Same pose as Odometer, computed without allocating memory.
+
+    update() is Viper code working on integers in a preallocated
+    array, so it can run at kHz rates without triggering the garbage
+    collector. Position is kept in half encoder ticks, heading as the
+    cumulative tick difference of the wheels; get_curr_pose() converts
+    to meters and radians (and allocates, so call it at a lower rate).
+    With start(hz) the timer interrupts the main code between any two
+    bytecodes; get_curr_pose() retries when an update happened while it
+    was reading the state (sequence lock).
+    """
+    HARD_IRQ = True  # update() does not allocate
+
+    def __init__(self):
+        super().__init__()
+        self.state = array('i', (0 for _ in range(9)))
+        self.state[K] = BAM_PER_TICK
+        self.cos_table = make_cos_table()
+        self._update = make_update(self.enc_a._pos, self.enc_b._pos,
+                                   self.state, self.cos_table)
+
+    def update(self):
+        """Update current pose using the latest encoder values"""
+        self._update()
+
+    def get_curr_pose(self):
+        s = self.state
+        while True:
+            seq = s[SEQ]
+            x, y = s[X], s[Y]
+            x_rem, y_rem = s[X_REM], s[Y_REM]
+            tick_diff = s[TICK_DIFF]
+            if not seq & 1 and s[SEQ] == seq:
+                break
+        x = (x + x_rem / (1 << Q)) * METERS_PER_TICK / 2
+        y = (y + y_rem / (1 << Q)) * METERS_PER_TICK / 2
+        ang = tick_diff * METERS_PER_TICK / TRACK_WIDTH
+        return (x, y, ang)
@@ -11,15 +11,35 @@ MicroPython code for Pico car project using:
 import gc
 import math
 import network
+import socket
+import struct
 import uasyncio as asyncio
 import _thread
+from array import array
 from machine import Pin, PWM
 import time
 from secrets import secrets
 from odometer import Odometer
-from parameters import (TICKS_PER_METER, FULL_SPD,
+from fast_odometer import FastOdometer
+from motors import Motors
+from core1 import Core1
+from recorder import FlightRecorder, REC_FORMAT
+from mission import MissionStore
+from pure_pursuit import PurePursuit
+from motion_profile import TrapezoidProfile
+from turn_controller import TurnController
+from scheduler import Scheduler
+from parameters import (TICKS_PER_METER, TRACK_WIDTH, FULL_SPD,
                         LOW_SPD, APPROACH_DIST,
-                        STOP_DIST, TURN_SPD, ANGLE_TOL)
+                        STOP_DIST, TURN_SPD,
+                        HTTP_PORT, STREAM_PORT, STREAM_TIMEOUT,
+                        UDP_PORT, UDP_RESYNC, UDP_TIMEOUT,
+                        TELEM_PORT, TELEM_HZ,
+                        CONTROL_HZ, NAV_HZ, LED_HZ, STATS_HZ,
+                        ODOM_HZ, FAST_ODOMETER,
+                        SPEED_CONTROL, MOTOR_HZ,
+                        FULL_TICK_RATE, TURN_TICK_RATE, DUAL_CORE,
+                        REC_RECORDS, NAV_MODE, TURN_DRIVE_ANGLE)
 
 ssid = secrets['ssid']
 password = secrets['wifi_password']
@@ -35,12 +55,40 @@ html = """<!DOCTYPE html>
 
 # navigation parameters
 wp_flag = 0
-wp_file = "waypoints.txt"
-waypoints = []
+mission = MissionStore("waypoints.bin", "waypoints.txt")
+profile = TrapezoidProfile()
+turner = TurnController()
+pursuit = PurePursuit(mission, profile)
 joy_active = False
 joy_vals = (0, 0)
+count = 0
+pose = (0.0, 0.0, 0.0)
+wp = None
 KS = 5  # steering proportionality constant (units: 1/sec)
 
+# UDP command datagram: seq (u32), speed, steer (i16, scaled by
+# CMD_SCALE), button bits (u8: circle, triangle, square, cross, ps)
+CMD_FORMAT = '<IhhB'
+CMD_SIZE = struct.calcsize(CMD_FORMAT)
+CMD_SCALE = 32767
+udp_dropped = 0  # count of stale, duplicate or malformed datagrams
+
+# Telemetry frame: seq (u32), time (u32 ms), x, y, theta (f32),
+# encoder counts a, b (i32), signed PWM a, b (i32), wp_flag (u8)
+TELEM_FORMAT = '<IIfffiiiiB'
+TELEM_SIZE = struct.calcsize(TELEM_FORMAT)
+telem_buf = bytearray(TELEM_SIZE)
+telem_writer = None  # StreamWriter of the current subscriber
+telem_skipped = 0  # frames not sent because the subscriber was behind
+
+# last values written to the motor driver (for telemetry)
+mtr_sign = array('i', (0, 0))  # +1 FWD, -1 REV, 0 OFF
+pwm_vals = array('i', (0, 0))  # duty_u16
+cmd_spds = array('f', (0.0, 0.0))  # last lin_spd, ang_spd of drive_motors
+
+# flight recorder of the last REC_RECORDS control ticks
+recorder = FlightRecorder(REC_RECORDS)
+
 # setup onboard LED
 led = Pin("LED", Pin.OUT, value=0)
 
@@ -55,8 +103,19 @@ enb = PWM(Pin(16))
 ena.freq(1_000)
 enb.freq(1_000)
 
+def make_odometer():
+    """Odometer selected in parameters.py, timer driven if ODOM_HZ.
+    With DUAL_CORE core 1 updates a FastOdometer."""
+    if FAST_ODOMETER or DUAL_CORE:
+        odo = FastOdometer()
+    else:
+        odo = Odometer()
+    if ODOM_HZ and not DUAL_CORE:
+        odo.start(ODOM_HZ)
+    return odo
+
 # Instantiate odometer
-odom = Odometer()
+odom = make_odometer()
 
 def set_mtr_dirs(a_mode, b_mode):
     """Set motor direction pins for both motors.
@@ -65,22 +124,28 @@ def set_mtr_dirs(a_mode, b_mode):
     if a_mode == 'FWD':
         in1.value(0)
         in2.value(1)
+        mtr_sign[0] = 1
     elif a_mode == 'REV':
         in1.value(1)
         in2.value(0)
+        mtr_sign[0] = -1
     else:  # Parked
         in1.value(0)
         in2.value(0)
+        mtr_sign[0] = 0
 
     if b_mode == 'FWD':
         in3.value(0)
         in4.value(1)
+        mtr_sign[1] = 1
     elif b_mode == 'REV':
         in3.value(1)
         in4.value(0)
+        mtr_sign[1] = -1
     else:  # Parked
         in3.value(0)
         in4.value(0)
+        mtr_sign[1] = 0
 
 def set_mtr_spds(a_PWM_val, b_PWM_val):
     """set speeds for both a and b motors
@@ -93,10 +158,24 @@ def set_mtr_spds(a_PWM_val, b_PWM_val):
         b_val = 65_530
     ena.duty_u16(a_val)
     enb.duty_u16(b_val)
+    pwm_vals[0] = a_val
+    pwm_vals[1] = b_val
+
+# Closed loop wheel speed control
+if DUAL_CORE:
+    motors = Core1(odom, set_mtr_dirs, set_mtr_spds)
+else:
+    motors = Motors(set_mtr_dirs, set_mtr_spds)
+    if SPEED_CONTROL:  # the encoders have edge rings (SPD_RING_SIZE)
+        motors.attach(odom)
 
 def move_stop():
-    set_mtr_dirs('OFF', 'OFF')
-    set_mtr_spds(0, 0)
+    cmd_spds[0] = 0.0
+    cmd_spds[1] = 0.0
+    motors.stop()
+    if not (DUAL_CORE and motors.running):  # else core 1 owns the outputs
+        set_mtr_dirs('OFF', 'OFF')
+        set_mtr_spds(0, 0)
 
 # Stop the robot NOW
 move_stop()
@@ -104,8 +183,14 @@ move_stop()
 def reset_odometer():
     """Delete odom object and create new one at pose 0,0,0"""
     global odom
+    if DUAL_CORE:  # core 1 owns the odometer
+        motors.reset_odometer()
+        return
+    odom.stop()
     del(odom)
-    odom = Odometer()
+    odom = make_odometer()
+    if SPEED_CONTROL:
+        motors.attach(odom)
 
 def drive_motors(lin_spd, ang_spd):
     """
@@ -114,7 +199,16 @@ def drive_motors(lin_spd, ang_spd):
     angular speed: ang_spd (in range -1 to +1)
     Calculate both motor speeds and
     drive motors accordingly.
+    With SPEED_CONTROL these are target tick rates for the
+    wheel speed PID loops, otherwise PWM values.
     """
+    cmd_spds[0] = lin_spd
+    cmd_spds[1] = ang_spd
+    if SPEED_CONTROL or DUAL_CORE:
+        lin_tps = FULL_TICK_RATE * lin_spd
+        ang_tps = TURN_TICK_RATE * ang_spd
+        motors.set_targets(lin_tps - ang_tps, lin_tps + ang_tps)
+        return
     
     # linear components
     a_lin_spd = int(FULL_SPD * lin_spd)
@@ -186,30 +280,43 @@ def drive_and_steer(spd, steer):
     
     # drive motors
     drive_motors(spd, ang_spd)
+
+# ang_spd per unit lin_spd driving an arc of curvature 1/m
+# (wheel speed difference = curvature * speed * TRACK_WIDTH)
+if SPEED_CONTROL or DUAL_CORE:
+    ARC_GAIN = FULL_TICK_RATE * TRACK_WIDTH / (2 * TURN_TICK_RATE)
+else:
+    ARC_GAIN = FULL_SPD * TRACK_WIDTH / (2 * TURN_SPD)
+
+def drive_arc(spd, curvature):
+    """Drive forward at spd (range: 0 to 1) along an arc of
+    curvature (1/m, + is CCW), slower where the outer wheel would
+    need more than full speed. With spd 0, turn in place in the
+    direction of curvature.
+    """
+    if not spd:
+        drive_motors(0, math.copysign(1, curvature))
+        return
+    spd = min(spd, 1 / (1 + abs(curvature) * TRACK_WIDTH / 2))
+    drive_motors(spd, ARC_GAIN * spd * curvature)
     
 def do_buttons(buttons):
     """
     Callback for dispatching button-push events
     to desired actions
     """
-    global wp_flag, waypoints
+    global wp_flag
     one, two, three, home, p3 = buttons
     if one:
         # save current position to waypoints file
         x, y, angle = odom.get_curr_pose()
-        line = "%f, %f\n" % (x, y)
-        with open(wp_file, "a") as f:
-            f.write(line)
+        mission.append(x, y)
     
     if two:
-        # read wp_file
-        print("Reading wp_file")
-        with open(wp_file) as f:
-            lines = f.readlines()
-            for line in lines:
-                str_x, str_y = line.split(',')
-                wp = float(str_x), float(str_y)
-                waypoints.append(wp)
+        # load waypoints file (if changed), start from first waypoint
+        if mission.load():
+            print("Read waypoints file")
+        mission.rewind()
         
     if three:
         # drive waypoints
@@ -220,10 +327,9 @@ def do_buttons(buttons):
         reset_odometer()
     
     if p3:
-        # erase wp_file
-        print("Erasing wp_file")
-        with open(wp_file, "w") as f:
-            f.write('')
+        # erase waypoints file
+        print("Erasing waypoints file")
+        mission.clear()
 
 wlan = network.WLAN(network.STA_IF)
 
@@ -249,28 +355,93 @@ def connect():
         print('ip = ' + status[0])
     return ip
 
-async def serve_client(reader, writer):
+def apply_command(speed, steer, buttons):
+    """Set joystick values and dispatch any button pushes"""
     global joy_vals, joy_active
+    joy_vals = (speed, steer)
+    if any(joy_vals):
+        joy_active = True
+    if any(buttons):
+        do_buttons(buttons)
+
+def handle_command(req_str):
+    """Apply one joystick command of the form
+    speed/steer/b1/b2/b3/b4/p3 and return a status string.
+    """
+    try:
+        speed, steer, b1, b2, b3, b4, p3 = req_str.split('/')
+        buttons = (int(b1), int(b2), int(b3), int(b4), int(p3))
+        apply_command(float(speed), float(steer), buttons)
+        stateis = "OK"
+    except Exception as e:
+        stateis = str(e)
+    return stateis
+
+async def serve_recorder(req_str, writer):
+    """
+    Flight recorder routes:
+        rec/freeze  stop recording, keep the records
+        rec/resume  record again
+        rec/dump    download the records, oldest first, as one
+                    binary blob of REC_FORMAT records
+    Dumping holds the recorder frozen while sending (so records are
+    not overwritten mid-download), yielding to the control loop
+    between chunks. Afterwards it records again, unless it was
+    frozen before or a rec/freeze arrived during the dump.
+    """
+    if req_str == 'rec/dump':
+        was_frozen = recorder.frozen
+        recorder.freeze()
+        freezes = recorder.freezes
+        try:
+            writer.write('HTTP/1.0 200 OK\r\n'
+                         'Content-type: application/octet-stream\r\n'
+                         'Content-Length: %d\r\n'
+                         'X-Record-Format: %s\r\n\r\n'
+                         % (recorder.size(), REC_FORMAT))
+            for chunk in recorder.chunks():
+                for i in range(0, len(chunk), 1024):
+                    writer.write(chunk[i:i + 1024])
+                    await writer.drain()
+        finally:
+            if not was_frozen and recorder.freezes == freezes:
+                recorder.resume()
+        return
+    if req_str == 'rec/freeze':
+        recorder.freeze()
+    elif req_str == 'rec/resume':
+        recorder.resume()
+    else:
+        writer.write('HTTP/1.0 404 Not Found\r\n\r\n')
+        return
+    writer.write('HTTP/1.0 200 OK\r\nContent-type: text/plain\r\n\r\n')
+    writer.write('%s %d records\n' % (
+        'frozen' if recorder.frozen else 'recording', recorder.count))
+
+async def serve_client(reader, writer):
     request_line = await reader.readline()
-    while await reader.readline() != b"\r\n":
+    while await reader.readline() not in (b"\r\n", b""):
         pass
 
     req_parts = request_line.split()
+    if len(req_parts) < 2:  # client went away without a request
+        writer.close()
+        await writer.wait_closed()
+        return
     req_str = req_parts[1].decode('utf-8')[1:]
     # print(req_str)
 
-    stateis = ""
-    try:
-        speed, steer, b1, b2, b3, b4, p3 = req_str.split('/')
-        joy_vals = (float(speed), float(steer))
-        if any(joy_vals):
-            joy_active = True
-        buttons = (int(b1), int(b2), int(b3), int(b4), int(p3))
-        if any(buttons):
-            do_buttons(buttons)
-        stateis = "OK"
-    except Exception as e:
-        stateis = str(e)
+    if req_str.startswith('rec/'):
+        try:
+            await serve_recorder(req_str, writer)
+            await writer.drain()
+        except Exception as e:
+            print("Recorder client dropped:", e)
+        writer.close()
+        await writer.wait_closed()
+        return
+
+    stateis = handle_command(req_str)
 
     response = html
     writer.write('HTTP/1.0 200 OK\r\nContent-type: text/html\r\n\r\n')
@@ -280,68 +451,277 @@ async def serve_client(reader, writer):
     await writer.wait_closed()
     # print("Client disconnected")
 
+async def serve_stream(reader, writer):
+    """
+    Persistent control channel: the client keeps one connection
+    open and sends one command per line:
+        speed/steer/b1/b2/b3/b4/p3/seq
+    Each frame is acknowledged with a line "seq/status" so the
+    client can measure round trip time.
+    If no frame arrives within STREAM_TIMEOUT the connection
+    is dropped and the motors are stopped.
+    """
+    global joy_vals
+    print("Stream client connected")
+    try:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), STREAM_TIMEOUT)
+            if not line:
+                break
+            req_str, _, seq = line.decode('utf-8').strip().rpartition('/')
+            stateis = handle_command(req_str)
+            writer.write('%s/%s\n' % (seq, stateis))
+            await writer.drain()
+    except Exception as e:
+        print("Stream client dropped:", e)
+    joy_vals = (0, 0)
+    writer.close()
+    await writer.wait_closed()
+    print("Stream client disconnected")
+
+async def serve_udp():
+    """
+    Receive fixed size command datagrams (see CMD_FORMAT).
+    Datagrams of any other length are dropped. Datagrams whose
+    sequence number is not newer than the last one applied are
+    dropped too, so a late packet never overrides a newer command.
+    After UDP_RESYNC consecutive rejects the sender is assumed to
+    have restarted and its sequence is accepted.
+    If no datagram arrives within UDP_TIMEOUT of the last command
+    applied, the joystick is zeroed (the motors stop).
+    """
+    global udp_dropped, joy_vals
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(socket.getaddrinfo("0.0.0.0", UDP_PORT)[0][-1])
+    sock.setblocking(False)
+    stream = asyncio.StreamReader(sock)
+    last_seq = None
+    rejects = 0
+    active = False  # a command was applied since the last timeout
+    while True:
+        try:
+            # one byte more than a command, to tell oversized ones
+            data = await asyncio.wait_for(stream.read(CMD_SIZE + 1),
+                                          UDP_TIMEOUT)
+        except asyncio.TimeoutError:
+            if active:
+                print("UDP commands timed out")
+                joy_vals = (0, 0)
+                active = False
+            continue
+        if len(data) != CMD_SIZE:
+            udp_dropped += 1
+            continue
+        seq, speed, steer, bits = struct.unpack(CMD_FORMAT, data)
+        if last_seq is not None and rejects < UDP_RESYNC:
+            diff = (seq - last_seq) & 0xFFFFFFFF
+            if diff == 0 or diff >= 0x80000000:
+                udp_dropped += 1
+                rejects += 1
+                continue
+        last_seq = seq
+        rejects = 0
+        buttons = tuple((bits >> i) & 1 for i in range(5))
+        apply_command(speed / CMD_SCALE, steer / CMD_SCALE, buttons)
+        active = True
+
+async def serve_telem(reader, writer):
+    """
+    Stream telemetry frames (see TELEM_FORMAT) at TELEM_HZ to one
+    subscriber; a new connection replaces the previous one.
+    Each frame is packed into telem_buf and drained before the next
+    one is written, so at most one frame is ever queued. Frames
+    whose time passed while the subscriber was still receiving are
+    skipped (counted in telem_skipped) rather than sent late.
+    """
+    global telem_writer, telem_skipped
+    if telem_writer is not None:
+        telem_writer.close()
+    telem_writer = writer
+    print("Telemetry client connected")
+    period = 1_000_000 // TELEM_HZ
+    seq = 0
+    deadline = time.ticks_us()
+    try:
+        while telem_writer is writer:
+            x, y, theta = pose
+            struct.pack_into(TELEM_FORMAT, telem_buf, 0,
+                             seq, time.ticks_ms(), x, y, theta,
+                             odom.enc_a.value(), odom.enc_b.value(),
+                             mtr_sign[0] * pwm_vals[0],
+                             mtr_sign[1] * pwm_vals[1], wp_flag)
+            writer.write(telem_buf)
+            await writer.drain()
+            seq += 1
+            deadline = time.ticks_add(deadline, period)
+            late = time.ticks_diff(time.ticks_us(), deadline)
+            if late >= 0:
+                # still sending when the next frame was due: skip ahead
+                skip = late // period + 1
+                telem_skipped += skip
+                seq += skip
+                deadline = time.ticks_add(deadline, skip * period)
+            await asyncio.sleep_ms(
+                (time.ticks_diff(deadline, time.ticks_us()) + 999) // 1_000)
+    except Exception as e:
+        print("Telemetry client dropped:", e)
+    if telem_writer is writer:
+        telem_writer = None
+    writer.close()
+    await writer.wait_closed()
+    print("Telemetry client disconnected")
+
+def control_tick():
+    """Fast tick: update odometer, drive with joystick or to waypoints"""
+    global pose, joy_active, count
+
+    # Update odometer (unless the timer or core 1 does it)
+    if not (ODOM_HZ or DUAL_CORE):
+        odom.update()
+    pose = odom.get_curr_pose()
+    x, y, theta = pose
+    recorder.record(time.ticks_us(), odom.enc_a.value(), odom.enc_b.value(),
+                    x, y, theta, cmd_spds[0], cmd_spds[1],
+                    mtr_sign[0] * pwm_vals[0], mtr_sign[1] * pwm_vals[1],
+                    min(control_task.late_us, 65_535),
+                    min(control_task.exec_us, 65_535), wp_flag)
+
+    # drive with joystick
+    if joy_active:
+        if any(joy_vals):
+            count = 5
+            drive_motors(*joy_vals)
+        elif count:  # keep doing this a few more cycles
+            count -= 1
+            drive_motors(*joy_vals)
+            joy_active = False
+
+    # drive to waypoints
+    drive_leg()
+
+def nav_tick():
+    """Slow tick: start each leg to the waypoints in sequence
+    (drive_leg drives it)"""
+    global wp_flag, wp
+
+    if wp_flag:
+        if wp_flag == 1:
+            if NAV_MODE == 'pursuit':
+                pursuit.start(pose)
+                wp_flag = 4 if pursuit.active else 0
+                return
+            # get next wp
+            wp = mission.next()
+            if wp is not None:
+                turner.start()
+                wp_flag = 2  # turn toward wp (in control_tick)
+            else:
+                wp_flag = 0  # finished
+
+def drive_leg():
+    """Turn toward and drive to waypoints (wp_flag 2, 3 & 4)
+    every control tick"""
+    global wp_flag
+
+    if wp_flag == 2:  # turn to aim at wp
+        dist, rel_angle = rel_polar_coords_to_pt(pose, wp)
+        ang_spd = turner.update(rel_angle)
+        if ang_spd is not None and turner.timed_out():
+            move_stop()
+            if abs(rel_angle) < TURN_DRIVE_ANGLE:
+                profile.start()
+                wp_flag = 3  # drive to wp, steering corrects the rest
+            else:
+                print("Turn timed out %.2f rad off, mission aborted"
+                      % rel_angle)
+                wp_flag = 0
+            print(pose)
+        elif ang_spd is not None:
+            drive_motors(0, ang_spd)
+        else:
+            move_stop()
+            profile.start()
+            wp_flag = 3  # drive to wp
+            print(pose)
+
+    elif wp_flag == 3:
+        # Drive along a straight line to waypoint
+        dist, rel_angle = rel_polar_coords_to_pt(pose, wp)
+        if dist > STOP_DIST and abs(rel_angle) < math.pi / 2:
+            spd = profile.update(dist)
+            if profile.stalled():
+                leg_stalled(dist)
+                return
+            if dist < APPROACH_DIST:
+                rel_angle = 0  # too close to steer by
+            drive_and_steer(spd, rel_angle)
+        else:  # arrived or just passed it
+            move_stop()
+            wp_flag = 1  # get next wp
+            print(pose)
+
+    elif wp_flag == 4:
+        # follow the path through the waypoints (NAV_MODE 'pursuit')
+        cmd = pursuit.update(pose)
+        if cmd is not None and profile.stalled():
+            pursuit.stop()
+            leg_stalled(pursuit.remaining)
+        elif cmd is not None:
+            drive_arc(*cmd)
+        else:
+            move_stop()
+            wp_flag = 0  # finished
+            print(pose)
+
+def leg_stalled(dist):
+    """End a leg that stopped getting closer to its goal, dist (m)
+    away: arrived if within APPROACH_DIST, else abort the mission"""
+    global wp_flag
+    move_stop()
+    if dist < APPROACH_DIST and wp_flag == 3:
+        wp_flag = 1  # get next wp
+    elif dist < APPROACH_DIST:
+        mission.resume(len(mission))  # final waypoint reached
+        wp_flag = 0  # finished
+    else:
+        print("Leg stalled %.3f m from its goal, mission aborted" % dist)
+        wp_flag = 0
+    print(pose)
+
+def heartbeat():
+    """Flash LED"""
+    led.toggle()
+
+def print_stats():
+    for line in sched.stats():
+        print(line)
+    if DUAL_CORE:
+        print(motors.stats_line())
+
+sched = Scheduler()
+control_task = sched.add(control_tick, CONTROL_HZ)
+if SPEED_CONTROL and not DUAL_CORE:
+    sched.add(motors.update, MOTOR_HZ, 'motors')
+sched.add(nav_tick, NAV_HZ)
+sched.add(heartbeat, LED_HZ)
+sched.add(print_stats, STATS_HZ, immediate=False)
+
 async def main():
-    global joy_active, wp_flag
     print('Connecting to Network...')
     connect()
 
     print('Setting up webserver...')
-    asyncio.create_task(asyncio.start_server(serve_client, "0.0.0.0", 80))
-    while True:
-
-        # Flash LED
-        led.toggle()
-
-        # Update odometer
-        pose = odom.update()
-
-        # drive with joystick
-        if joy_active:
-            if any(joy_vals):
-                count = 5
-                drive_motors(*joy_vals)
-            elif count:  # keep doing this a few more cycles
-                count -= 1
-                drive_motors(*joy_vals)
-                joy_active = False
-
-        # drive sequentially to waypoints
-        if wp_flag:
-            if wp_flag == 1:
-                # get next wp
-                if len(waypoints):
-                    wp = waypoints.pop(0)
-                    wp_flag = 2  # turn toward wp
-                else:
-                    wp_flag = 0  # finished
-
-            elif wp_flag == 2:  # turn to aim at wp
-                dist, rel_angle = rel_polar_coords_to_pt(pose, wp)
-                if rel_angle > ANGLE_TOL:
-                    # turn CCW
-                    drive_motors(0, 1)
-                elif rel_angle < -ANGLE_TOL:
-                    # turn CW
-                    drive_motors(0, -1)
-                else:
-                    move_stop()
-                    wp_flag = 3  # drive to wp
-                    print(pose)
-            
-            elif wp_flag == 3:
-                # Drive along a straight line to waypoint"""
-                dist, rel_angle = rel_polar_coords_to_pt(pose, wp)
-                spd = 1
-                if dist > APPROACH_DIST:
-                    drive_and_steer(spd, rel_angle)
-                else:
-                    move_stop()
-                    wp_flag = 1  # get next wp
-                    print(pose)
-
-        await asyncio.sleep(0.1)
+    asyncio.create_task(asyncio.start_server(serve_client, "0.0.0.0", HTTP_PORT))
+    asyncio.create_task(asyncio.start_server(serve_stream, "0.0.0.0", STREAM_PORT))
+    asyncio.create_task(serve_udp())
+    asyncio.create_task(asyncio.start_server(serve_telem, "0.0.0.0", TELEM_PORT))
+    if DUAL_CORE:
+        motors.start()
+    await sched.run()
 
 try:
     asyncio.run(main())
 finally:
+    if DUAL_CORE:
+        motors.shutdown()
     asyncio.new_event_loop()
@@ -0,0 +1,149 @@
+import os
+import struct
+from array import array
+
+WP_FORMAT = '<ff'  # x, y (meters) of one waypoint
+WP_SIZE = struct.calcsize(WP_FORMAT)
+
+
+class MissionStore():
+    """
+    Waypoints kept in a binary file of WP_FORMAT records (path) and,
+    in memory, in one array of x, y pairs read straight from it.
+
+    append() adds a waypoint to the end of the file without rewriting
+    it. next() returns the waypoint at the cursor and advances it, so
+    a mission is driven without shifting a list; rewind() / resume()
+    set the cursor to start again or continue from a waypoint index.
+    load() reads the file only when its size or modification time
+    changed since the last load. The text file txt_path ("x, y" per
+    line) is imported, replacing the binary file, whenever it changed
+    since it was last imported or the waypoints were cleared: its
+    (size, mtime) then is kept in path + ".src". A file ending in part of a record (an append cut
+    short) is cut back to whole records.
+    """
+
+    def __init__(self, path="waypoints.bin", txt_path="waypoints.txt"):
+        self.path = path
+        self.txt_path = txt_path
+        self.src_path = path + ".src"
+        self.coords = array('f')
+        self.cursor = 0  # index of the next waypoint
+        self.signature = None  # (size, mtime) of the file loaded
+
+    @staticmethod
+    def _stat_path(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st[6], st[8])
+
+    def _stat(self):
+        return self._stat_path(self.path)
+
+    def _txt_changed(self):
+        """(size, mtime) of txt_path if it changed since its import,
+        else None"""
+        txt_sig = self._stat_path(self.txt_path)
+        if txt_sig is None:
+            return None
+        try:
+            with open(self.src_path) as f:
+                size, mtime = f.read().split()
+            if (int(size), int(mtime)) == txt_sig:
+                return None
+        except (OSError, ValueError):
+            pass
+        return txt_sig
+
+    def import_txt(self, txt_sig=None):
+        """Write the waypoints of txt_path to the binary file"""
+        with open(self.txt_path) as src, open(self.path, "wb") as dst:
+            for line in src:
+                if line.strip():
+                    str_x, str_y = line.split(',')
+                    dst.write(struct.pack(WP_FORMAT, float(str_x), float(str_y)))
+        self._mark_imported(txt_sig)
+        self.signature = None  # reload what was imported
+
+    def _mark_imported(self, txt_sig=None):
+        """Record txt_path's (size, mtime) as imported, so it is not
+        imported again until it changes"""
+        if txt_sig is None:
+            txt_sig = self._stat_path(self.txt_path)
+        if txt_sig is not None:
+            with open(self.src_path, "w") as f:
+                f.write("%d %d" % txt_sig)
+
+    def _trim(self, size):
+        """Cut the file back to whole records"""
+        with open(self.path, "rb") as f:
+            data = f.read(size - size % WP_SIZE)
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+    def load(self):
+        """Read the file if it changed; return True if it was read"""
+        txt_sig = self._txt_changed()
+        if txt_sig is not None:
+            self.import_txt(txt_sig)
+        signature = self._stat()
+        if signature is None:  # neither file: empty mission
+            with open(self.path, "wb"):
+                pass
+            signature = self._stat()
+        elif signature[0] % WP_SIZE:
+            self._trim(signature[0])
+            signature = self._stat()
+        if signature == self.signature:
+            return False
+        n = signature[0] // WP_SIZE
+        coords = array('f', bytearray(n * WP_SIZE))
+        with open(self.path, "rb") as f:
+            f.readinto(coords)
+        self.coords = coords
+        self.signature = signature
+        if self.cursor > n:
+            self.cursor = n
+        return True
+
+    def append(self, x, y):
+        if self.signature is None:
+            self.load()  # import the text file first, if changed
+        with open(self.path, "ab") as f:
+            f.write(struct.pack(WP_FORMAT, x, y))
+        self.coords.append(x)
+        self.coords.append(y)
+        self.signature = self._stat()
+
+    def clear(self):
+        """Erase the waypoints; waypoints appended from now on are kept
+        until the text file changes"""
+        with open(self.path, "wb"):
+            pass
+        self._mark_imported()
+        self.coords = array('f')
+        self.cursor = 0
+        self.signature = self._stat()
+
+    def __len__(self):
+        return len(self.coords) // 2
+
+    def remaining(self):
+        return len(self) - self.cursor
+
+    def next(self):
+        """Next waypoint (x, y) and advance, None at the end"""
+        i = self.cursor
+        if i >= len(self):
+            return None
+        self.cursor = i + 1
+        return (self.coords[2 * i], self.coords[2 * i + 1])
+
+    def rewind(self):
+        self.cursor = 0
+
+    def resume(self, index):
+        """Continue the mission from waypoint index"""
+        self.cursor = min(max(index, 0), len(self))
@@ -0,0 +1,64 @@
+import math
+import time
+from parameters import (MAX_SPD, CRUISE_SPD, ACCEL, DECEL, MIN_SPD,
+                        STOP_DIST, LEG_PROGRESS, LEG_STALL_TIME,
+                        SPEED_CONTROL, DUAL_CORE, LOW_SPD, FULL_SPD)
+
+
+class TrapezoidProfile():
+    """
+    Speed along a leg of known remaining distance: accelerate at
+    ACCEL (m/s^2) up to the cruise speed, then decelerate at DECEL so
+    the speed would reach zero STOP_DIST before the goal.
+
+    Speeds are fractions of full speed (lin_spd of drive_motors,
+    MAX_SPD m/s at 1). update() is meant to be called every control
+    tick and measures the time since the previous call itself.
+    Below min_spd the robot would stall, so the speed is not taken
+    lower than that until the caller stops at STOP_DIST (default:
+    MIN_SPD with speed control, LOW_SPD open loop).
+    stalled() tells when dist has not come LEG_PROGRESS closer for
+    LEG_STALL_TIME, e.g. creeping at min_spd against stiction.
+    """
+
+    def __init__(self, cruise=CRUISE_SPD, accel=ACCEL, decel=DECEL,
+                 min_spd=None):
+        if min_spd is None:
+            if SPEED_CONTROL or DUAL_CORE:
+                min_spd = MIN_SPD
+            else:
+                min_spd = LOW_SPD / FULL_SPD
+        self.cruise = cruise
+        self.accel = accel / MAX_SPD  # in full speed fractions
+        self.decel = decel / MAX_SPD
+        self.min_spd = min_spd
+        self.spd = 0.0
+        self.last_us = time.ticks_us()
+        self.closest = None  # smallest dist so far
+        self.progress_us = self.last_us  # time closest last improved
+
+    def start(self, spd=0.0):
+        """Start a leg at speed spd"""
+        self.spd = spd
+        self.last_us = time.ticks_us()
+        self.closest = None
+        self.progress_us = self.last_us
+
+    def update(self, dist, limit=1.0):
+        """Speed for dist (m) to go, at most limit"""
+        now = time.ticks_us()
+        dt = time.ticks_diff(now, self.last_us) / 1_000_000
+        self.last_us = now
+        if self.closest is None or dist < self.closest - LEG_PROGRESS:
+            self.closest = dist
+            self.progress_us = now
+        spd = min(self.cruise, limit, self.spd + self.accel * dt)
+        # speed from which decelerating stops STOP_DIST before the goal
+        stop_spd = math.sqrt(2 * self.decel * max(dist - STOP_DIST, 0) / MAX_SPD)
+        self.spd = max(min(spd, stop_spd), self.min_spd)
+        return self.spd
+
+    def stalled(self):
+        """True if the leg made no progress for LEG_STALL_TIME"""
+        return (time.ticks_diff(time.ticks_us(), self.progress_us)
+                > LEG_STALL_TIME * 1_000_000)
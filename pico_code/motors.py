@@ -0,0 +1,138 @@
+import time
+from velocity import WheelSpeed
+from parameters import (SPD_KP, SPD_KI, SPD_KD, SPD_KF, SPD_KS,
+                        SPD_I_MAX, SPD_WINDOW_US)
+
+MAX_PWM = 65_530  # same limit as set_mtr_spds
+
+
+class SpeedPID():
+    """
+    Speed loop of one wheel: target and measured speed in ticks/sec,
+    output a signed PWM value.
+
+    Feed-forward (kf * target, plus ks to overcome stiction) provides
+    most of the output, so the PID only corrects the remaining error.
+    The derivative acts on the measurement, so target steps do not kick.
+    The integral always integrates the error, so a loaded or stalled
+    wheel gets the extra output it needs. Anti-windup: the integral is
+    limited to +-i_max and does not grow while the output is saturated
+    in the direction of the error.
+    """
+
+    def __init__(self, kp=SPD_KP, ki=SPD_KI, kd=SPD_KD, kf=SPD_KF, ks=SPD_KS,
+                 i_max=SPD_I_MAX, out_max=MAX_PWM):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.kf = kf
+        self.ks = ks
+        self.i_max = i_max
+        self.out_max = out_max
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.prev_measured = 0.0
+
+    def update(self, target, measured, dt):
+        error = target - measured
+        if target > 0:
+            ff = self.kf * target + self.ks
+        elif target < 0:
+            ff = self.kf * target - self.ks
+        else:
+            ff = 0.0
+        deriv = -self.kd * (measured - self.prev_measured) / dt
+        self.prev_measured = measured
+        integral = self.integral + self.ki * error * dt
+        if integral > self.i_max:
+            integral = self.i_max
+        elif integral < -self.i_max:
+            integral = -self.i_max
+        out = ff + self.kp * error + integral + deriv
+        if out > self.out_max:
+            out = self.out_max
+            if error < 0:
+                self.integral = integral
+        elif out < -self.out_max:
+            out = -self.out_max
+            if error > 0:
+                self.integral = integral
+        else:
+            self.integral = integral
+        return out
+
+
+class Motors():
+    """
+    Closed loop speed control of both wheels.
+
+    set_targets() takes target tick rates (ticks/sec, + is forward)
+    for motor A and B. update() is called at a fixed rate (see
+    MOTOR_HZ), measures the wheel speeds from the encoder edge times,
+    runs one SpeedPID per wheel and writes the motor driver through
+    the set_mtr_dirs / set_mtr_spds functions of main.py.
+    With both targets zero the motors are switched off and the loops
+    reset, so other code may drive the motors directly meanwhile.
+    """
+
+    def __init__(self, set_mtr_dirs, set_mtr_spds):
+        self.set_mtr_dirs = set_mtr_dirs
+        self.set_mtr_spds = set_mtr_spds
+        self.pid_a = SpeedPID()
+        self.pid_b = SpeedPID()
+        self.spd_a = None
+        self.spd_b = None
+        self.target_a = 0
+        self.target_b = 0
+        self.active = False
+        self.last_us = time.ticks_us()
+
+    def attach(self, odom):
+        """Measure wheel speeds with the encoders of odom"""
+        self.spd_a = WheelSpeed(odom.enc_a, SPD_WINDOW_US)
+        self.spd_b = WheelSpeed(odom.enc_b, SPD_WINDOW_US)
+
+    def set_targets(self, a_tps, b_tps):
+        if not (a_tps or b_tps):
+            self.stop()
+            return
+        if not self.active:
+            self.pid_a.reset()
+            self.pid_b.reset()
+            self.last_us = time.ticks_us()
+            self.active = True
+        self.target_a = a_tps
+        self.target_b = b_tps
+
+    def stop(self):
+        self.target_a = 0
+        self.target_b = 0
+        if self.active:
+            self.active = False
+            self.set_mtr_dirs('OFF', 'OFF')
+            self.set_mtr_spds(0, 0)
+
+    def speeds(self):
+        """Measured (a, b) wheel speeds in ticks/sec"""
+        return (self.spd_a.speed(), self.spd_b.speed())
+
+    def update(self):
+        now = time.ticks_us()
+        dt = time.ticks_diff(now, self.last_us) / 1_000_000
+        self.last_us = now
+        if not self.active or dt <= 0:
+            return
+        a_out = self.pid_a.update(self.target_a, self.spd_a.speed(), dt)
+        b_out = self.pid_b.update(self.target_b, self.spd_b.speed(), dt)
+        self.set_mtr_dirs(direction(a_out), direction(b_out))
+        self.set_mtr_spds(abs(a_out), abs(b_out))
+
+
+def direction(pwm):
+    if pwm > 0:
+        return 'FWD'
+    elif pwm < 0:
+        return 'REV'
+    return 'OFF'
@@ -1,7 +1,14 @@
 import encoder_rp2 as encoder
-from machine import Pin
+from machine import Pin, Timer
 import math
-from parameters import TRACK_WIDTH, METERS_PER_TICK
+from parameters import (TRACK_WIDTH, METERS_PER_TICK, ENC_RING_SIZE,
+                        SPD_RING_SIZE, SPEED_CONTROL, DUAL_CORE)
+
+# encoder edge rings only when something reads them
+if SPEED_CONTROL or DUAL_CORE:
+    RING_SIZE = max(ENC_RING_SIZE, SPD_RING_SIZE)
+else:
+    RING_SIZE = ENC_RING_SIZE
 
 
 class Odometer():
@@ -11,11 +18,13 @@ class Odometer():
     length dimensions are in meters
     angle dimensions are in radians (+) CCW from X axis.
     """
+    # update() allocates floats, so the timer runs it as a soft IRQ
+    HARD_IRQ = False
 
     def __init__(self):
         # Set up encoders
-        self.enc_a = encoder.Encoder(1, Pin(12))
-        self.enc_b = encoder.Encoder(0, Pin(14))
+        self.enc_a = encoder.Encoder(1, Pin(12), ring_size=RING_SIZE)
+        self.enc_b = encoder.Encoder(0, Pin(14), ring_size=RING_SIZE)
         
         # Set some initial values
         self.prev_enc_a_val = 0
@@ -23,10 +32,30 @@ class Odometer():
         self.x = 0.0
         self.y = 0.0
         self.ang = 0.0
-        
+        self.pose = (0.0, 0.0, 0.0)
+        self.timer = None
 
     def get_curr_pose(self):
-        return (self.x, self.y, self.ang)
+        """Latest pose, without computing anything.
+        The pose tuple is replaced in one step, so it is consistent
+        even when update() runs from the timer."""
+        return self.pose
+
+    def start(self, hz):
+        """Update the pose from a machine.Timer, hz times a second"""
+        self.stop()
+        self.timer = Timer(-1)
+        self.timer.init(freq=hz, mode=Timer.PERIODIC, callback=self._on_timer,
+                        hard=self.HARD_IRQ)
+
+    def stop(self):
+        """Stop timer driven updates"""
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+
+    def _on_timer(self, timer):
+        self.update()
 
     def update(self):
         """
@@ -49,8 +78,15 @@ class Odometer():
         # incremental angle change of car
         delta_ang = (delta_enc_b - delta_enc_a) * METERS_PER_TICK / TRACK_WIDTH
 
+        # the wheels move along an arc, its chord points along the
+        # mean heading of the move
+        if delta_ang:
+            chord = 2 * delta_dist_fwd * math.sin(delta_ang / 2) / delta_ang
+        else:
+            chord = delta_dist_fwd
+
         # convert incremental motion from polar to rect coords
-        delta_x, delta_y = self.p2r(delta_dist_fwd, self.ang)
+        delta_x, delta_y = self.p2r(chord, self.ang + delta_ang / 2)
 
         # update x, y coords of pose
         self.x += delta_x
@@ -59,7 +95,8 @@ class Odometer():
         # update pose angle
         self.ang += delta_ang
 
-        return (self.x, self.y, self.ang)
+        self.pose = (self.x, self.y, self.ang)
+        return self.pose
 
     # geometry helper functions
     def p2r(self, r, theta):
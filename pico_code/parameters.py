@@ -14,9 +14,92 @@ LOW_SPD  = 30_000
 # motor PWM value turning in place
 TURN_SPD = 20_000
 
+# dual core mode (core1.py): odometry & wheel speed control run on
+# core 1 at CORE1_HZ, instead of from ODOM_HZ timer and MOTOR_HZ task
+DUAL_CORE = False
+CORE1_HZ = 1000
+
+# closed loop wheel speed control (motors.py)
+# The tick rates and gains below are tuned on the simulator's motor
+# model (sim/plant.py); measure them on the robot before enabling.
+SPEED_CONTROL = False  # drive_motors sets target tick rates for the PID loops
+MOTOR_HZ = 100  # PID update rate
+FULL_TICK_RATE = 4_200  # ticks/sec at full joystick speed (about FULL_SPD)
+TURN_TICK_RATE = 1_300  # ticks/sec turning in place (about TURN_SPD)
+SPD_KF = 10.0  # feed-forward PWM per tick/sec
+SPD_KS = 6_500  # feed-forward PWM to overcome stiction
+SPD_KP = 8.0  # PWM per tick/sec of error
+SPD_KI = 80.0  # PWM per tick of accumulated error
+SPD_KD = 0.0  # PWM per tick/sec^2
+SPD_I_MAX = 20_000  # PWM, limit of the integral term (anti-windup)
+SPD_WINDOW_US = 20_000  # wheel speed averaging window
+
 # distance zones for detrmining proximity to goal
-APPROACH_DIST = 0.15  # meters (6 inches)
+APPROACH_DIST = 0.15  # meters (6 inches), stop steering within
 STOP_DIST = 0.025  # meters (1 inch)
 
+# speed profile of waypoint legs (motion_profile.py)
+MAX_SPD = FULL_TICK_RATE * METERS_PER_TICK  # m/s at full speed
+CRUISE_SPD = 1.0  # fraction of full speed
+ACCEL = 1.0  # m/s^2
+DECEL = 0.6  # m/s^2
+# lowest speed before stopping, the robot stalls below it
+# (with SPEED_CONTROL; open loop LOW_SPD is the lowest speed)
+MIN_SPD = 0.08
+# a leg that gets less than LEG_PROGRESS closer to its goal in
+# LEG_STALL_TIME ends: arrived if within APPROACH_DIST, else the
+# mission is aborted
+LEG_PROGRESS = 0.01  # meters
+LEG_STALL_TIME = 2.0  # seconds
+
 # half width of "good enough" zone when turning to angle
 ANGLE_TOL = 0.035  # radians (2 degrees)
+
+# turning in place to face a waypoint (turn_controller.py),
+# speeds are ang_spd of drive_motors (-1 .. +1)
+TURN_KP = 6.0  # turning speed per radian of heading error
+# lowest turning speed, the robot stalls below it: TURN_MIN_SPD with
+# SPEED_CONTROL, open loop TURN_MIN_PWM (ang_spd TURN_MIN_PWM / TURN_SPD)
+TURN_MIN_SPD = 0.2
+TURN_MIN_PWM = 12_000  # must be below TURN_SPD so the turn can slow down
+TURN_MAX_SPD = 1.0  # highest turning speed
+TURN_SETTLE_TICKS = 5  # control ticks within ANGLE_TOL to finish
+# a turn not finished within TURN_TIMEOUT ends: the leg is driven
+# if within TURN_DRIVE_ANGLE (steering corrects the rest), else
+# the mission is aborted
+TURN_TIMEOUT = 5.0  # seconds
+TURN_DRIVE_ANGLE = 0.5  # radians
+
+# waypoint navigation: 'pursuit' follows the waypoint path without
+# stopping (pure_pursuit.py), 'stop_turn' stops, turns in place to
+# face each waypoint, then drives straight to it
+NAV_MODE = 'pursuit'
+PP_LOOKAHEAD = 0.2  # meters along the path to the goal point
+PP_MAX_ANGLE = 1.2  # radians, turn in place when the goal is further off
+
+# webserver / control channel ports
+HTTP_PORT = 80
+STREAM_PORT = 8080  # persistent (keep-alive) command stream
+STREAM_TIMEOUT = 1.0  # seconds without a frame before stream is dropped
+UDP_PORT = 5005  # datagram command channel
+UDP_RESYNC = 50  # consecutive stale datagrams before accepting a new sequence
+UDP_TIMEOUT = 1.0  # seconds without a datagram before the motors are stopped
+TELEM_PORT = 8081  # binary telemetry stream, one subscriber
+TELEM_HZ = 20  # telemetry frame rate
+
+# odometry
+ODOM_HZ = 0  # timer driven odometry update rate (e.g. 1000), 0 = update in control_tick
+FAST_ODOMETER = True  # fixed point Viper odometer (fast_odometer.py)
+ENC_RING_SIZE = 0  # encoder edges timestamped for wheel speed, 0 = none
+# edges timestamped at least when SPEED_CONTROL or DUAL_CORE measure
+# wheel speeds (covers SPD_WINDOW_US at full speed)
+SPD_RING_SIZE = 256
+
+# flight recorder (recorder.py): control ticks kept, REC_SIZE bytes each
+REC_RECORDS = 1000  # 10 s at CONTROL_HZ
+
+# scheduler rates (Hz)
+CONTROL_HZ = 100  # odometry & joystick motor control
+NAV_HZ = 10  # waypoint navigation
+LED_HZ = 5  # heartbeat LED toggle
+STATS_HZ = 0.1  # print scheduler statistics
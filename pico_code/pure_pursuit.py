@@ -0,0 +1,129 @@
+import math
+from parameters import PP_LOOKAHEAD, PP_MAX_ANGLE, STOP_DIST, TRACK_WIDTH
+
+
+class PurePursuit():
+    """
+    Follow the polyline from the robot's start position through the
+    remaining waypoints of a MissionStore without stopping at them.
+
+    Each update() finds the point of the path closest to the robot,
+    walks PP_LOOKAHEAD further along the path to a goal point and
+    returns the speed and curvature of the arc from the robot to it,
+    so corners are rounded off instead of stopped at. A waypoint is
+    consumed (mission.next()) once the robot is within PP_LOOKAHEAD
+    of it and nearer to the following leg than to the one ending at
+    it. When the goal point is more than PP_MAX_ANGLE off the heading
+    (at the start, or after a U-turn waypoint), it turns in place
+    first. The speed follows profile (a TrapezoidProfile) over the
+    path length left, limited in curves so the outer wheel stays
+    within full speed; it finishes at the final waypoint (within
+    STOP_DIST or once past it).
+    """
+
+    def __init__(self, mission, profile):
+        self.mission = mission
+        self.profile = profile
+        self.prev = (0.0, 0.0)  # start of the current leg
+        self.active = False
+        self.remaining = 0.0  # path length left at the last update
+
+    def start(self, pose):
+        """Start at pose along the remaining waypoints"""
+        self.prev = (pose[0], pose[1])
+        self.active = self.mission.remaining() > 0
+        self.profile.start()
+
+    def _point(self, i):
+        coords = self.mission.coords
+        return (coords[2 * i], coords[2 * i + 1])
+
+    def _leg(self, i):
+        """Start and end of leg i (ending at waypoint i)"""
+        if i == self.mission.cursor:
+            return self.prev, self._point(i)
+        return self._point(i - 1), self._point(i)
+
+    def _project(self, x, y, i):
+        """Distance from x, y to leg i, how far along it (0..1)
+        and the distance left to its end"""
+        (x0, y0), (x1, y1) = self._leg(i)
+        dx, dy = x1 - x0, y1 - y0
+        seg2 = dx * dx + dy * dy
+        t = ((x - x0) * dx + (y - y0) * dy) / seg2 if seg2 else 1.0
+        t = min(max(t, 0.0), 1.0)
+        px, py = x0 + t * dx, y0 + t * dy
+        return (math.sqrt((x - px) ** 2 + (y - py) ** 2), t,
+                (1.0 - t) * math.sqrt(seg2))
+
+    def _goal(self, x, y, t):
+        """Point PP_LOOKAHEAD along the path from the projection of
+        x, y (at t on the current leg), and path length to the end"""
+        n = len(self.mission)
+        i = self.mission.cursor
+        (x0, y0), (x1, y1) = self._leg(i)
+        px, py = x0 + t * (x1 - x0), y0 + t * (y1 - y0)
+        to_go = PP_LOOKAHEAD
+        goal = None
+        remaining = 0.0
+        while i < n:
+            x1, y1 = self._point(i)
+            seg = math.sqrt((x1 - px) ** 2 + (y1 - py) ** 2)
+            if goal is None:
+                if seg >= to_go:
+                    f = to_go / seg
+                    goal = (px + f * (x1 - px), py + f * (y1 - py))
+                else:
+                    to_go -= seg
+            remaining += seg
+            px, py = x1, y1
+            i += 1
+        if goal is None:
+            goal = (px, py)
+        return goal, remaining
+
+    def stop(self):
+        """Give up on the rest of the path"""
+        self.active = False
+
+    def update(self, pose):
+        """
+        Return (lin_spd, curvature) to drive, curvature in 1/m
+        (+ is CCW), or None when the path is finished. lin_spd 0
+        means turn in place, in the direction of the curvature.
+        """
+        if not self.active:
+            return None
+        x, y, theta = pose
+        mission = self.mission
+        n = len(mission)
+
+        # near the end of the leg, move on to the next one once it
+        # is closer (legs may overlap, e.g. going back the same way)
+        dist, t, left = self._project(x, y, mission.cursor)
+        while mission.cursor + 1 < n and left < PP_LOOKAHEAD:
+            next_dist, next_t, next_left = self._project(x, y, mission.cursor + 1)
+            if next_dist > dist and t < 1.0:
+                break
+            self.prev = mission.next()
+            dist, t, left = next_dist, next_t, next_left
+
+        (gx, gy), remaining = self._goal(x, y, t)
+        self.remaining = remaining
+        if remaining < STOP_DIST or (mission.cursor == n - 1 and t >= 1.0):
+            mission.next()
+            self.active = False
+            return None
+
+        # goal point in robot coordinates
+        dx, dy = gx - x, gy - y
+        alpha = math.atan2(dy, dx) - theta
+        alpha = math.atan2(math.sin(alpha), math.cos(alpha))
+        if abs(alpha) > PP_MAX_ANGLE:
+            # turn in place towards the goal point
+            self.profile.start()
+            return 0.0, alpha
+        ld = math.sqrt(dx * dx + dy * dy)
+        curvature = 2 * math.sin(alpha) / ld if ld else 0.0
+        limit = 1 / (1 + abs(curvature) * TRACK_WIDTH / 2)
+        return self.profile.update(remaining, limit), curvature
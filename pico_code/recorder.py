@@ -0,0 +1,63 @@
+import struct
+
+# One record per control tick:
+# time (u32 us), encoder counts a, b (i32), x, y, theta (f32),
+# commanded lin_spd, ang_spd (f32), signed PWM a, b (i32),
+# tick lateness & previous tick execution time (u16 us), wp_flag (u8)
+REC_FORMAT = '<IiifffffiiHHB'
+REC_SIZE = struct.calcsize(REC_FORMAT)
+
+
+class FlightRecorder():
+    """
+    Fixed size ring of the last n_records control tick records.
+
+    The buffer is allocated once at startup (n_records * REC_SIZE
+    bytes); record() packs into it in place and overwrites the oldest
+    record when full. While frozen, record() is ignored so the
+    records leading up to an incident are kept; freezes counts the
+    calls to freeze(), so a caller holding the recorder frozen can
+    tell whether someone else froze it meanwhile. chunks() returns the
+    records oldest first as (at most two) memoryview slices of the
+    buffer, for sending without a copy.
+    """
+
+    def __init__(self, n_records):
+        self.n_records = n_records
+        self.buf = bytearray(n_records * REC_SIZE)
+        self.head = 0  # next record written
+        self.count = 0  # records held, up to n_records
+        self.frozen = False
+        self.freezes = 0
+
+    def record(self, *values):
+        if self.frozen:
+            return
+        struct.pack_into(REC_FORMAT, self.buf, self.head * REC_SIZE, *values)
+        self.head += 1
+        if self.head == self.n_records:
+            self.head = 0
+        if self.count < self.n_records:
+            self.count += 1
+
+    def freeze(self):
+        self.frozen = True
+        self.freezes += 1
+
+    def resume(self):
+        self.frozen = False
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def size(self):
+        """Bytes held"""
+        return self.count * REC_SIZE
+
+    def chunks(self):
+        view = memoryview(self.buf)
+        split = self.head * REC_SIZE
+        if self.count < self.n_records:
+            return (view[:split],)
+        return (view[split:], view[:split])
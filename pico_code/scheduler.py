@@ -0,0 +1,102 @@
+"""
+Fixed rate scheduler for the PicoBot main loop.
+
+Each task runs at its own rate against time.ticks_us() deadlines.
+The next deadline is the previous deadline plus the period (not
+"now" plus the period), so execution time does not make the loop
+drift. A task that falls more than a whole period behind is counted
+as an overrun and re-synchronized instead of running a burst of
+catch-up calls.
+"""
+
+import time
+import uasyncio as asyncio
+
+
+class PeriodicTask():
+    """A function called every period_us, plus its timing statistics"""
+
+    def __init__(self, fn, hz, name, immediate=True):
+        self.fn = fn
+        self.name = name
+        self.period_us = int(1_000_000 / hz)
+        self.immediate = immediate  # first run at start, else a period later
+        self.deadline = 0
+        self.runs = 0
+        self.overruns = 0
+        self.max_jitter_us = 0  # worst lateness of a start vs its deadline
+        self.max_exec_us = 0  # worst execution time
+        self.late_us = 0  # lateness of the current (or last) run
+        self.exec_us = 0  # execution time of the last run
+
+    def reset_stats(self):
+        self.runs = 0
+        self.overruns = 0
+        self.max_jitter_us = 0
+        self.max_exec_us = 0
+
+    def stats(self):
+        return "%s: %g Hz runs=%d overruns=%d max_jitter=%dus max_exec=%dus" % (
+            self.name, 1_000_000 / self.period_us, self.runs,
+            self.overruns, self.max_jitter_us, self.max_exec_us)
+
+
+class Scheduler():
+    """
+    Run several periodic tasks from one coroutine.
+
+        sched = Scheduler()
+        sched.add(control_tick, 100)
+        sched.add(nav_tick, 10)
+        sched.add(report, 0.1, immediate=False)  # first at 10 s
+        await sched.run()
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    def add(self, fn, hz, name=None, immediate=True):
+        task = PeriodicTask(fn, hz, name or fn.__name__, immediate)
+        self.tasks.append(task)
+        return task
+
+    def stats(self):
+        return [task.stats() for task in self.tasks]
+
+    def reset_stats(self):
+        for task in self.tasks:
+            task.reset_stats()
+
+    async def run(self):
+        start = time.ticks_us()
+        for task in self.tasks:
+            if task.immediate:
+                task.deadline = start
+            else:
+                task.deadline = time.ticks_add(start, task.period_us)
+        while True:
+            for task in self.tasks:
+                now = time.ticks_us()
+                late = time.ticks_diff(now, task.deadline)
+                if late < 0:
+                    continue
+                if late > task.max_jitter_us:
+                    task.max_jitter_us = late
+                task.late_us = late
+                task.fn()
+                done = time.ticks_us()
+                exec_us = time.ticks_diff(done, now)
+                task.exec_us = exec_us
+                if exec_us > task.max_exec_us:
+                    task.max_exec_us = exec_us
+                task.runs += 1
+                task.deadline = time.ticks_add(task.deadline, task.period_us)
+                if time.ticks_diff(done, task.deadline) >= 0:
+                    # missed the next deadline too: skip ahead
+                    task.overruns += 1
+                    task.deadline = time.ticks_add(done, task.period_us)
+
+            # sleep until the earliest deadline (rounded up to whole ms)
+            now = time.ticks_us()
+            wait_us = min(time.ticks_diff(task.deadline, now) for task in self.tasks)
+            await asyncio.sleep_ms((max(0, wait_us) + 999) // 1_000)
@@ -0,0 +1,58 @@
+import math
+import time
+from parameters import (TURN_KP, TURN_MIN_SPD, TURN_MAX_SPD, ANGLE_TOL,
+                        TURN_SETTLE_TICKS, TURN_TIMEOUT, TURN_MIN_PWM,
+                        TURN_SPD, SPEED_CONTROL, DUAL_CORE)
+
+
+class TurnController():
+    """
+    Turn in place to a heading.
+
+    update() takes the heading error (radians, + is CCW) and returns
+    the ang_spd for drive_motors: proportional to the error (TURN_KP
+    per radian) up to TURN_MAX_SPD, but at least TURN_MIN_SPD so the
+    wheels do not stall short of the target (default: TURN_MIN_SPD
+    with speed control, TURN_MIN_PWM / TURN_SPD open loop). Within ANGLE_TOL the
+    wheels are stopped; once the error has stayed within it for
+    TURN_SETTLE_TICKS calls in a row, update() returns None (done).
+    timed_out() tells when the turn took longer than TURN_TIMEOUT.
+    """
+
+    def __init__(self, kp=TURN_KP, min_spd=None,
+                 max_spd=TURN_MAX_SPD, tol=ANGLE_TOL,
+                 settle_ticks=TURN_SETTLE_TICKS, timeout=TURN_TIMEOUT):
+        if min_spd is None:
+            if SPEED_CONTROL or DUAL_CORE:
+                min_spd = TURN_MIN_SPD
+            else:
+                min_spd = TURN_MIN_PWM / TURN_SPD
+        self.kp = kp
+        self.min_spd = min_spd
+        self.max_spd = max(max_spd, min_spd)
+        self.tol = tol
+        self.settle_ticks = settle_ticks
+        self.timeout_ms = int(timeout * 1000)
+        self.settled = 0
+        self.corrections = 0  # times the turn started again (diagnostic)
+        self.start_ms = time.ticks_ms()
+
+    def start(self):
+        self.settled = 0
+        self.corrections = 0
+        self.start_ms = time.ticks_ms()
+
+    def timed_out(self):
+        return time.ticks_diff(time.ticks_ms(), self.start_ms) > self.timeout_ms
+
+    def update(self, error):
+        if abs(error) <= self.tol:
+            self.settled += 1
+            if self.settled >= self.settle_ticks:
+                return None
+            return 0.0
+        if self.settled:
+            self.corrections += 1
+            self.settled = 0
+        spd = min(self.kp * abs(error), self.max_spd)
+        return math.copysign(max(spd, self.min_spd), error)
@@ -0,0 +1,70 @@
+import time
+
+
+class WheelSpeed():
+    """
+    Wheel speed in encoder ticks per second, from the edge ring
+    buffer of an Encoder created with ring_size. Integer arithmetic
+    only, so speed() does not allocate (usable on core 1).
+
+    At speed, many edges fall within window_us: the speed is the
+    count of ticks between the newest edge and the first edge at
+    least window_us before it, divided by their time difference.
+    At a crawl there are few edges in the window and the same formula
+    becomes the time between the last edges. When no edge has been
+    seen for longer than the span measured, the speed can be at most
+    one tick per time since the last edge; it is zero after timeout_us.
+    Only the newest half of the ring is used, so interrupts arriving
+    during the calculation can not overwrite the edges being read.
+    """
+
+    def __init__(self, encoder, window_us=20_000, timeout_us=100_000):
+        if not encoder.ring_size:
+            raise ValueError('encoder has no edge ring buffer')
+        self.times = encoder._times
+        self.positions = encoder._positions
+        self.head = encoder._head
+        self.mask = encoder.ring_size - 1
+        self.usable = encoder.ring_size // 2
+        self.window_us = window_us
+        self.timeout_us = timeout_us
+
+    def speed(self):
+        times = self.times
+        positions = self.positions
+        mask = self.mask
+        n = self.head[0]
+        avail = min(n, self.usable)
+        if avail < 2:
+            return 0
+        newest = (n - 1) & mask
+        t_last = times[newest]
+        p_last = positions[newest]
+        since_last = time.ticks_diff(time.ticks_us(), t_last)
+        if since_last > self.timeout_us:
+            return 0
+
+        # binary search for the newest edge at least window_us before t_last
+        lo, hi = 1, avail - 1
+        while lo < hi:
+            k = (lo + hi) // 2
+            if time.ticks_diff(t_last, times[(n - 1 - k) & mask]) >= self.window_us:
+                hi = k
+            else:
+                lo = k + 1
+        oldest = (n - 1 - lo) & mask
+        dt = time.ticks_diff(t_last, times[oldest])
+        ticks = p_last - positions[oldest]
+        if dt <= 0:  # all edges seen by a single interrupt
+            dt = max(since_last, 1)
+        spd = ticks * 1_000_000 // dt
+
+        # no edge for longer than the span measured: slowing down, can
+        # not be faster than one tick per since_last
+        if since_last > dt:
+            limit = 1_000_000 // since_last
+            if spd > limit:
+                spd = limit
+            elif spd < -limit:
+                spd = -limit
+        return spd
@@ -0,0 +1,22 @@
+"""
+Host side PicoBot simulator.
+
+Provides CPython stand-ins for the MicroPython modules used by
+pico_code (machine, rp2, network, uasyncio, micropython) and a
+differential drive plant model, so the unmodified firmware can run
+on a PC in real time or faster.
+
+    from sim import Simulation
+    sim = Simulation(fast=True, duration=30)
+    sim.run()
+    print(sim.plant.pose(), sim.main.odom.get_curr_pose())
+
+or from the repository root:
+
+    python -m sim --duration 30
+"""
+
+from .plant import DiffDrivePlant
+from .runner import Simulation
+
+__all__ = ['DiffDrivePlant', 'Simulation']
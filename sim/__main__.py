@@ -0,0 +1,49 @@
+"""
+Command line entry point:
+
+    python -m sim [--realtime] [--duration S] [--port-offset N]
+
+The robot's servers listen on their usual ports plus port-offset,
+e.g. ps3_joypub can drive the simulated robot on localhost:8080.
+"""
+
+import argparse
+import asyncio
+
+from .runner import Simulation
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--realtime', action='store_true',
+                        help='run on the wall clock instead of a virtual one')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='simulated seconds to run (default: forever)')
+    parser.add_argument('--port-offset', type=int, default=8000,
+                        help='added to the robot server ports')
+    parser.add_argument('--workdir', default=None,
+                        help='robot file system directory (default: temporary)')
+    parser.add_argument('--report', type=float, default=1.0,
+                        help='seconds between true pose reports, 0 = off')
+    args = parser.parse_args()
+
+    sim = Simulation(fast=not args.realtime, duration=args.duration,
+                     port_offset=args.port_offset, workdir=args.workdir)
+
+    async def report(sim):
+        while True:
+            await asyncio.sleep(args.report)
+            x, y, theta = sim.plant.pose()
+            print('t=%.1f true pose x=%.3f y=%.3f theta=%.3f'
+                  % (sim.plant.t, x, y, theta))
+
+    if args.report > 0:
+        sim.add_task(report)
+    try:
+        sim.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
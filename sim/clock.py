@@ -0,0 +1,108 @@
+"""
+Simulation clock.
+
+now() returns the time (seconds) of the running simulation event
+loop, which is either the real monotonic clock or a virtual clock
+that jumps ahead whenever every task is asleep.
+The MicroPython ticks_* functions are added to the time module so
+unmodified robot code can use them.
+"""
+
+import asyncio
+import selectors
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+now = time.monotonic
+
+
+def ticks_ms():
+    return (round(now() * 1_000_000) // 1_000) & TICKS_MAX
+
+
+def ticks_us():
+    return round(now() * 1_000_000) & TICKS_MAX
+
+
+def ticks_cpu():
+    return ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & TICKS_MAX
+    return ((diff + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1_000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1_000_000)
+
+
+def install():
+    """Add MicroPython's ticks functions to the time module"""
+    for fn in (ticks_ms, ticks_us, ticks_cpu, ticks_add, ticks_diff,
+               sleep_ms, sleep_us):
+        setattr(time, fn.__name__, fn)
+
+
+class _FastForwardSelector():
+    """Selector wrapper that never blocks: a select() that would have
+    waited instead advances the loop's virtual clock."""
+
+    def __init__(self, selector, loop):
+        self._selector = selector
+        self._loop = loop
+
+    def select(self, timeout=None):
+        if timeout is None:
+            return self._selector.select(None)
+        events = self._selector.select(0)
+        if not events and timeout:
+            self._loop.advance(timeout)
+        else:
+            # busy iterations still cost time, so code spinning on
+            # sleep(0) until a deadline cannot stall the clock
+            self._loop.advance(self._loop.iteration_cost)
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop running on a virtual clock, as fast as the host allows.
+
+    Real sockets are still polled (without waiting), so clients outside
+    the simulation can talk to the robot, they just see time run faster.
+    """
+
+    iteration_cost = 10e-6  # virtual seconds charged per busy loop iteration
+
+    def __init__(self):
+        super().__init__(selectors.DefaultSelector())
+        self._vtime = 0.0
+        self._selector = _FastForwardSelector(self._selector, self)
+
+    def time(self):
+        return self._vtime
+
+    def advance(self, seconds):
+        self._vtime += seconds
+
+
+def new_loop(fast):
+    """Create the event loop for a simulation run and make now() follow it"""
+    global now
+    loop = VirtualTimeLoop() if fast else asyncio.new_event_loop()
+    now = loop.time
+    return loop
@@ -0,0 +1,138 @@
+"""
+Stand-in for MicroPython's machine module.
+
+Pin levels and PWM duties are kept in module level tables keyed by
+pin id, where the plant model reads them.
+"""
+
+import asyncio
+
+pin_values = {}  # pin id -> 0 / 1
+pwm_duties = {}  # pin id -> u16 duty
+timers = []  # initialised Timers, armed once the event loop runs
+
+
+class Pin():
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        if value is not None:
+            pin_values[id] = 1 if value else 0
+        else:
+            pin_values.setdefault(id, 0)
+
+    def value(self, x=None):
+        if x is None:
+            return pin_values[self.id]
+        pin_values[self.id] = 1 if x else 0
+
+    def __call__(self, x=None):
+        return self.value(x)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not pin_values[self.id])
+
+    def __repr__(self):
+        return 'Pin(%s)' % (self.id,)
+
+
+class PWM():
+    def __init__(self, pin, freq=None, duty_u16=None):
+        self.pin = pin
+        self._freq = freq or 1_000
+        pwm_duties[pin.id] = duty_u16 or 0
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return pwm_duties[self.pin.id]
+        value = int(value)
+        if not 0 <= value <= 65_535:
+            raise ValueError('duty must be 0-65535')
+        pwm_duties[self.pin.id] = value
+
+    def deinit(self):
+        pwm_duties[self.pin.id] = 0
+
+
+class Timer():
+    """
+    Soft timer: the callback runs on the event loop, between
+    coroutine steps, like a scheduled callback on the Pico.
+    """
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self._handle = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None, hard=False):
+        self.deinit()
+        self._mode = mode
+        self._period = 1 / freq if freq > 0 else period / 1000
+        self._callback = callback
+        timers.append(self)
+        try:
+            self._arm(asyncio.get_running_loop())
+        except RuntimeError:
+            pass  # armed by the Simulation when its loop starts
+
+    def _arm(self, loop):
+        self._loop = loop
+        self._next = loop.time() + self._period
+        self._handle = loop.call_at(self._next, self._fire)
+
+    def _fire(self):
+        if self._mode == Timer.PERIODIC:
+            self._next += self._period
+            self._handle = self._loop.call_at(self._next, self._fire)
+        else:
+            self.deinit()
+        if self._callback is not None:
+            self._callback(self)
+
+    def deinit(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self in timers:
+            timers.remove(self)
+
+
+def freq(hz=None):
+    return 125_000_000
+
+
+def unique_id():
+    return b'PicoBotSim'
+
+
+def reset():
+    raise SystemExit('machine.reset()')
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
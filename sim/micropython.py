@@ -0,0 +1,44 @@
+"""Stand-in for MicroPython's micropython module"""
+
+import asyncio
+import builtins
+import sys
+
+
+def viper(fn):
+    return fn
+
+
+def native(fn):
+    return fn
+
+
+def const(value):
+    return value
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(fn, arg):
+    asyncio.get_event_loop().call_soon(fn, arg)
+
+
+def opt_level(level=None):
+    return 0
+
+
+def _ptr(obj):
+    return obj
+
+
+# Viper pointer casts index straight into the array
+builtins.ptr8 = _ptr
+builtins.ptr16 = _ptr
+builtins.ptr32 = _ptr
+
+
+# The MicroPython compiler resolves @micropython.viper / .native without
+# an import, so the decorators must be reachable as a builtin name.
+builtins.micropython = sys.modules[__name__]
@@ -0,0 +1,35 @@
+"""Stand-in for MicroPython's network module (always connects)"""
+
+STA_IF = 0
+AP_IF = 1
+STAT_GOT_IP = 3
+
+
+class WLAN():
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self._status = 0
+
+    def active(self, is_active=None):
+        if is_active is not None:
+            self._active = bool(is_active)
+        return self._active
+
+    def config(self, *args, **kwargs):
+        pass
+
+    def connect(self, ssid=None, password=None):
+        self._status = STAT_GOT_IP
+
+    def disconnect(self):
+        self._status = 0
+
+    def isconnected(self):
+        return self._status == STAT_GOT_IP
+
+    def status(self, param=None):
+        return self._status
+
+    def ifconfig(self):
+        return ('127.0.0.1', '255.0.0.0', '127.0.0.1', '127.0.0.1')
@@ -0,0 +1,107 @@
+"""
+Differential drive plant model.
+
+Reads the motor driver pins (direction inputs and PWM enables) that
+main.py drives through set_mtr_dirs / set_mtr_spds, turns them into
+wheel speeds and integrates the true pose of the robot. Wheel travel
+is converted to encoder edges which are fed to the rp2 state machines
+of the encoders, so encoder_rp2 and odometer run unmodified.
+"""
+
+import math
+
+from . import machine, rp2
+
+
+class Wheel():
+    """One motor / wheel / encoder assembly of the L298N wiring in main.py
+
+    pwm: enable pin, fwd / rev: direction input that is high when
+    driving forward / reverse, enc: encoder base pin.
+    """
+
+    def __init__(self, pwm, fwd, rev, enc):
+        self.pwm = pwm
+        self.fwd = fwd
+        self.rev = rev
+        self.enc = enc
+        self.speed = 0.0  # m/s
+        self.dist = 0.0  # m since start
+        self.ticks = 0  # encoder edges fed so far
+
+    def command(self):
+        """Return commanded duty in the range -1 .. +1"""
+        duty = machine.pwm_duties.get(self.pwm, 0) / 65_535
+        fwd = machine.pin_values.get(self.fwd, 0)
+        rev = machine.pin_values.get(self.rev, 0)
+        if fwd and not rev:
+            return duty
+        elif rev and not fwd:
+            return -duty
+        return 0.0
+
+
+class DiffDrivePlant():
+    """
+    Wheel speed follows the commanded duty with a first order lag of
+    time constant tau. Duties below deadband do not move the wheel
+    (stiction), above it speed rises linearly to max_speed at full duty.
+    track_width and wheel_circ are the true geometry of the simulated
+    robot and may differ from the values in parameters.py.
+    """
+
+    def __init__(self, track_width=0.1778, wheel_circ=0.214,
+                 ticks_per_rev=2464, max_speed=0.5, deadband=0.1,
+                 tau=0.08):
+        # motor A drives the left wheel, motor B the right one
+        self.left = Wheel(pwm=21, fwd=19, rev=20, enc=12)
+        self.right = Wheel(pwm=16, fwd=17, rev=18, enc=14)
+        self.track_width = track_width
+        self.meters_per_tick = wheel_circ / ticks_per_rev
+        self.max_speed = max_speed
+        self.deadband = deadband
+        self.tau = tau
+        self.t = 0.0
+        self.x = 0.0
+        self.y = 0.0
+        self.theta = 0.0
+        self.path_length = 0.0
+
+    def target_speed(self, duty):
+        mag = abs(duty)
+        if mag <= self.deadband:
+            return 0.0
+        spd = (mag - self.deadband) / (1 - self.deadband) * self.max_speed
+        return math.copysign(spd, duty)
+
+    def step(self, dt):
+        """Advance the model by dt seconds"""
+        alpha = 1 - math.exp(-dt / self.tau)
+        for wheel in (self.left, self.right):
+            target = self.target_speed(wheel.command())
+            wheel.speed += (target - wheel.speed) * alpha
+            wheel.dist += wheel.speed * dt
+            ticks = int(wheel.dist / self.meters_per_tick)
+            sm = rp2.state_machines.get(wheel.enc)
+            if sm is not None:
+                sm.feed(ticks - wheel.ticks)
+            wheel.ticks = ticks
+
+        # exact arc integration of the true pose
+        v = (self.left.speed + self.right.speed) / 2
+        w = (self.right.speed - self.left.speed) / self.track_width
+        ds = v * dt
+        dtheta = w * dt
+        if abs(dtheta) > 1e-9:
+            r = ds / dtheta
+            self.x += r * (math.sin(self.theta + dtheta) - math.sin(self.theta))
+            self.y -= r * (math.cos(self.theta + dtheta) - math.cos(self.theta))
+        else:
+            self.x += ds * math.cos(self.theta)
+            self.y += ds * math.sin(self.theta)
+        self.theta += dtheta
+        self.path_length += abs(ds)
+        self.t += dt
+
+    def pose(self):
+        return (self.x, self.y, self.theta)
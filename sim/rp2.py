@@ -0,0 +1,80 @@
+"""
+Stand-in for MicroPython's rp2 module.
+
+PIO programs are not executed. Instead a StateMachine created for the
+quadrature encoder program is driven by the plant model, which pushes
+the encoder pin states into its rx FIFO and calls the irq handler just
+like the real PIO program does on every edge.
+"""
+
+from collections import deque
+
+state_machines = {}  # input base pin id -> StateMachine
+
+# encoder pin states (B << 1 | A) visited when turning forward
+_QUADRATURE = (0, 1, 3, 2)
+
+
+class PIO():
+    IN_LOW = 0
+    IN_HIGH = 1
+    OUT_LOW = 2
+    OUT_HIGH = 3
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+
+    def __init__(self, id):
+        self.id = id
+
+
+def asm_pio(*args, **kwargs):
+    def decorator(program):
+        return program
+    return decorator
+
+
+class StateMachine():
+    def __init__(self, id, program=None, freq=None, in_base=None, **kwargs):
+        self.id = id
+        self.program = program
+        self.in_base = in_base
+        self.handler = None
+        self.running = False
+        self.fifo = deque()
+        self.phase = 0
+        if in_base is not None:
+            state_machines[in_base.id] = self
+
+    def irq(self, handler=None, trigger=0, hard=False):
+        self.handler = handler
+
+    def exec(self, instr):
+        pass
+
+    def active(self, value=None):
+        if value is None:
+            return self.running
+        self.running = bool(value)
+
+    def rx_fifo(self):
+        return len(self.fifo)
+
+    def get(self, buf=None, shift=0):
+        return self.fifo.popleft() >> shift
+
+    def put(self, value, shift=0):
+        pass
+
+    def feed(self, steps):
+        """Advance the encoder by steps edges (negative = reverse)"""
+        if not self.running or not steps:
+            return
+        inc = 1 if steps > 0 else -1
+        for _ in range(abs(steps)):
+            self.phase = (self.phase + inc) & 3
+            self.fifo.append(_QUADRATURE[self.phase])
+        if self.handler is not None:
+            self.handler(self)
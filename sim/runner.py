@@ -0,0 +1,199 @@
+"""
+Run the unmodified PicoBot firmware (pico_code/main.py) on CPython.
+"""
+
+import asyncio
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+from . import clock
+from .plant import DiffDrivePlant
+
+PICO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'pico_code')
+STUBS = ('machine', 'rp2', 'network', 'uasyncio', 'micropython')
+
+_current = None
+
+
+def current():
+    if _current is None:
+        raise RuntimeError('uasyncio.run() called outside of a Simulation')
+    return _current
+
+
+def install_stubs():
+    """Make the MicroPython-only modules importable"""
+    for name in STUBS:
+        sys.modules[name] = importlib.import_module('sim.' + name)
+    secrets = types.ModuleType('secrets')
+    secrets.secrets = {'ssid': 'picobot-sim', 'wifi_password': ''}
+    sys.modules['secrets'] = secrets
+    clock.install()
+
+
+def purge_firmware():
+    """Forget previously imported firmware modules so each run starts fresh"""
+    for fname in os.listdir(PICO_DIR):
+        name, ext = os.path.splitext(fname)
+        if ext == '.py':
+            sys.modules.pop(name, None)
+
+
+class Simulation():
+    """
+    One run of main.py against a simulated robot.
+
+    fast: run on a virtual clock, as fast as the host allows,
+          otherwise in real time.
+    duration: stop after this many (simulated) seconds, None = forever.
+    port_offset: added to every *_PORT in parameters.py so the
+          servers can bind without root (80 -> 8080 + ...).
+    workdir: robot file system (waypoints file etc.); a temporary copy
+          of pico_code/waypoints.txt is used when None.
+    plant: DiffDrivePlant, a default one is created when None.
+    dt: plant integration step (s).
+    params: values to override in parameters.py, e.g.
+          {'NAV_MODE': 'stop_turn'} (values derived from them in
+          parameters.py are not recomputed).
+
+    hooks are called with the main module before main() starts,
+    tasks are coroutine functions called with the Simulation and run
+    next to main(). Either may call stop().
+    """
+
+    def __init__(self, fast=True, duration=None, port_offset=8000,
+                 workdir=None, plant=None, dt=0.001, params=None):
+        self.fast = fast
+        self.duration = duration
+        self.port_offset = port_offset
+        self.workdir = workdir
+        self.plant = plant or DiffDrivePlant()
+        self.dt = dt
+        self.params = params or {}
+        self.hooks = []
+        self.tasks = []
+        self.main = None
+        self.loop = None
+        self.servers = []
+        self._stop = None
+
+    def add_hook(self, fn):
+        self.hooks.append(fn)
+
+    def add_task(self, coro_fn):
+        self.tasks.append(coro_fn)
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    def now(self):
+        return clock.now()
+
+    def run(self):
+        """Import (and thereby run) main.py; returns when the run ends"""
+        global _current
+        install_stubs()
+        purge_firmware()
+        from . import machine, rp2
+        machine.pin_values.clear()
+        machine.pwm_duties.clear()
+        machine.timers.clear()
+        rp2.state_machines.clear()
+
+        tmpdir = None
+        if self.workdir is None:
+            tmpdir = tempfile.TemporaryDirectory(prefix='picobot-sim-')
+            self.workdir = tmpdir.name
+            shutil.copy(os.path.join(PICO_DIR, 'waypoints.txt'), self.workdir)
+        cwd = os.getcwd()
+        sys.path.insert(0, PICO_DIR)
+        _current = self
+        try:
+            parameters = importlib.import_module('parameters')
+            for name in dir(parameters):
+                if name.endswith('_PORT'):
+                    setattr(parameters, name,
+                            getattr(parameters, name) + self.port_offset)
+            for name, value in self.params.items():
+                if not hasattr(parameters, name):
+                    raise AttributeError('parameters.py has no %s' % name)
+                setattr(parameters, name, value)
+            os.chdir(self.workdir)
+            self.main = importlib.import_module('main')
+        finally:
+            os.chdir(cwd)
+            sys.path.remove(PICO_DIR)
+            _current = None
+            if tmpdir is not None:
+                tmpdir.cleanup()
+                self.workdir = None
+        return self
+
+    def run_coroutine(self, coro):
+        """Called by uasyncio.run() from within main.py"""
+        self.loop = clock.new_loop(self.fast)
+        asyncio.set_event_loop(self.loop)
+        try:
+            return self.loop.run_until_complete(self._supervise(coro))
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+            asyncio.set_event_loop(None)
+
+    async def _supervise(self, coro):
+        self._stop = asyncio.Event()
+        self.main = sys.modules['main']
+        for hook in self.hooks:
+            hook(self.main)
+        from . import machine
+        for timer in machine.timers:
+            if timer._handle is None:
+                timer._arm(self.loop)
+        tasks = [asyncio.ensure_future(coro),
+                 asyncio.ensure_future(self._run_plant())]
+        for fn in self.tasks:
+            task = asyncio.ensure_future(fn(self))
+            task.add_done_callback(self._task_done)
+            tasks.append(task)
+        stopper = asyncio.ensure_future(self._stop.wait())
+        try:
+            await asyncio.wait([tasks[0], stopper], timeout=self.duration,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks + [stopper]:
+                task.cancel()
+            results = await asyncio.gather(*tasks, stopper,
+                                           return_exceptions=True)
+            # tasks spawned by the firmware itself (servers, listeners)
+            spawned = asyncio.all_tasks() - {asyncio.current_task()}
+            for task in spawned:
+                task.cancel()
+            await asyncio.gather(*spawned, return_exceptions=True)
+            for server in self.servers:
+                server.close()
+            self.servers = []
+            for timer in list(machine.timers):
+                timer.deinit()
+        for result in results[2:]:
+            if isinstance(result, Exception):
+                raise result
+        if tasks[0].done() and not tasks[0].cancelled():
+            return tasks[0].result()
+
+    def _task_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self.stop()
+
+    async def _run_plant(self):
+        loop = asyncio.get_running_loop()
+        t_next = loop.time()
+        while True:
+            self.plant.step(self.dt)
+            t_next += self.dt
+            await asyncio.sleep(max(0.0, t_next - loop.time()))
@@ -0,0 +1,92 @@
+"""
+Stand-in for MicroPython's uasyncio, built on CPython's asyncio.
+
+Differences papered over:
+* StreamWriter.write accepts str and wait_closed() closes the stream.
+* StreamReader(sock) wraps a raw (e.g. UDP) socket like MicroPython's
+  Stream class does.
+* sleep_ms() exists.
+* run() executes on the loop of the current Simulation.
+"""
+
+import asyncio as _asyncio
+from asyncio import (CancelledError, Event, Lock, TimeoutError,  # noqa: F401
+                     create_task, current_task, gather, sleep, wait_for)
+
+from . import runner
+
+
+def sleep_ms(ms):
+    return _asyncio.sleep(ms / 1_000)
+
+
+class StreamWriter():
+    def __init__(self, writer):
+        self._writer = writer
+
+    def write(self, buf):
+        if isinstance(buf, str):
+            buf = buf.encode()
+        self._writer.write(bytes(buf))
+
+    async def drain(self):
+        await self._writer.drain()
+
+    def close(self):
+        self._writer.close()
+
+    async def wait_closed(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    def get_extra_info(self, name):
+        return self._writer.get_extra_info(name)
+
+
+class StreamReader():
+    """Stream over a raw socket, as in MicroPython's asyncio.StreamReader(sock)"""
+
+    def __init__(self, sock):
+        self.s = sock
+
+    async def read(self, n=-1):
+        loop = _asyncio.get_running_loop()
+        return await loop.sock_recv(self.s, n if n > 0 else 4096)
+
+    async def readexactly(self, n):
+        return await self.read(n)
+
+
+Stream = StreamReader
+
+
+async def start_server(callback, host, port, backlog=5):
+    async def client(reader, writer):
+        try:
+            await callback(reader, StreamWriter(writer))
+        except _asyncio.CancelledError:
+            pass  # run ended while the client was connected
+    server = await _asyncio.start_server(client, host, port, backlog=backlog,
+                                         reuse_address=True)
+    runner.current().servers.append(server)
+    return server
+
+
+async def open_connection(host, port):
+    reader, writer = await _asyncio.open_connection(host, port)
+    return reader, StreamWriter(writer)
+
+
+def run(coro):
+    return runner.current().run_coroutine(coro)
+
+
+def get_event_loop():
+    return _asyncio.get_event_loop()
+
+
+def new_event_loop():
+    return None